@@ -0,0 +1,202 @@
+"""
+SIGNIFICANCE:
+Asynchronous front end for the LLM 'Brain'. Generations run on a dedicated
+asyncio event loop using Ollama's AsyncClient, so several turns can be in
+flight at once, each one bounded by a first-token and an inter-token timeout
+and cancellable mid-stream (e.g. when the user interrupts with a new request).
+A cancelled turn is never written to memory.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+import ollama
+import config
+from llm_client import LLMClient, describe_llm_error
+
+_DONE = object()
+
+class _Turn:
+    """One in-flight generation, cancellable by the source (voice/text) that started it."""
+    def __init__(self, source):
+        self.source = source
+        self.future = None
+        self.cancelled = False   # Checked before every token and before the turn is written to memory
+        self.committing = False  # Past the last check: the reply is being persisted
+
+class AsyncLLMClient(LLMClient):
+    def __init__(self):
+        super().__init__()
+        self.async_client = ollama.AsyncClient(host=config.LLM_HOST)
+        self.loop = asyncio.new_event_loop()
+        self.active = set()  # _Turn of every running generation
+        self.active_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def achat_stream(self, user_text, turn=None, intent=None):
+        """
+        Async generator over reply tokens. Raises asyncio.CancelledError if the
+        turn is cancelled; timeouts end the turn with a spoken explanation.
+        """
+        if not user_text: return
+        self._turn_started()
+        try:
+            messages, context_hash, cached = await asyncio.to_thread(self._prepare_turn, user_text, intent)
+            if cached is not None:
+                self._raise_if_cancelled(turn)
+                yield cached
+                self._begin_commit(turn)
+                await asyncio.to_thread(self._record_turn, user_text, cached)
+                return
+
+            pieces = []
+            start = time.perf_counter()
+            try:
+                stream = await self.async_client.chat(
+                    model=config.LLM_MODEL,
+                    messages=messages,
+                    stream=True,
+                    keep_alive=config.LLM_KEEP_ALIVE,
+                    options=self._options()
+                )
+                async for chunk in self._with_timeouts(stream):
+                    token = chunk['message']['content']
+                    if token:
+                        if not pieces:
+                            self._record_ttft(time.perf_counter() - start)
+                        pieces.append(token)
+                        self._raise_if_cancelled(turn)
+                        yield token
+                    if chunk.get('done'):
+                        self._record_prompt_eval(messages, chunk)
+            except asyncio.CancelledError:
+                print(f"[LLM] Generation cancelled after {len(pieces)} tokens")
+                raise
+            except Exception as e:
+                print(f"LLM Error: {e!r}")
+                if not pieces:
+                    yield describe_llm_error(e)
+                return
+
+            self._begin_commit(turn)
+            await asyncio.to_thread(self._complete_turn, user_text, context_hash, "".join(pieces))
+        finally:
+            self._turn_finished()
+
+    def _raise_if_cancelled(self, turn):
+        task = asyncio.current_task()
+        if (turn and turn.cancelled) or (task and task.cancelling()):
+            raise asyncio.CancelledError()
+
+    def _begin_commit(self, turn):
+        """
+        Last cancellation check before the turn is written to memory. Under the
+        same lock as cancel(), so a turn is either cancelled or persisted, never both.
+        """
+        with self.active_lock:
+            self._raise_if_cancelled(turn)
+            if turn:
+                turn.committing = True
+
+    async def _with_timeouts(self, stream):
+        """Re-yields stream chunks, failing if the first or any later chunk is too slow."""
+        iterator = stream.__aiter__()
+        first_deadline = self.loop.time() + config.LLM_FIRST_TOKEN_TIMEOUT
+        timeout = config.LLM_FIRST_TOKEN_TIMEOUT
+        got_token = False
+        try:
+            while True:
+                try:
+                    # asyncio.timeout, unlike wait_for, never swallows a cancel that races a finished chunk
+                    async with asyncio.timeout(timeout):
+                        chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                # Until content arrives the first-token deadline keeps running
+                if not got_token and chunk['message']['content']:
+                    got_token = True
+                timeout = config.LLM_TOKEN_TIMEOUT if got_token else max(0.0, first_deadline - self.loop.time())
+                yield chunk
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    async def achat(self, user_text, turn=None, intent=None):
+        pieces = []
+        async for token in self.achat_stream(user_text, turn, intent):
+            pieces.append(token)
+        return "".join(pieces)
+
+    def submit(self, make_coro, source=None):
+        """
+        Schedules make_coro(turn) on the client's loop. Returns the turn, whose
+        future resolves to the coroutine's result.
+        """
+        turn = _Turn(source)
+        with self.active_lock:
+            turn.future = asyncio.run_coroutine_threadsafe(make_coro(turn), self.loop)
+            self.active.add(turn)
+        turn.future.add_done_callback(lambda _: self._discard(turn))
+        return turn
+
+    def _discard(self, turn):
+        with self.active_lock:
+            self.active.discard(turn)
+
+    def chat_async(self, user_text, source=None, intent=None):
+        """Starts a turn in the background; the future resolves to the full reply."""
+        return self.submit(lambda turn: self.achat(user_text, turn, intent), source).future
+
+    def chat_stream(self, user_text, intent=None, source=None):
+        """
+        Blocking token iterator for thread-based callers (TTS). Closing the
+        iterator early cancels the underlying generation.
+        """
+        tokens = queue.Queue()
+
+        async def pump(turn):
+            try:
+                async for token in self.achat_stream(user_text, turn, intent):
+                    tokens.put(token)
+            except Exception as e:
+                # Failures before streaming (prompt building, retrieval) would otherwise end silently
+                print(f"LLM Error: {e!r}")
+                tokens.put(describe_llm_error(e))
+            finally:
+                tokens.put(_DONE)
+
+        turn = self.submit(pump, source)
+        try:
+            while True:
+                token = tokens.get()
+                if token is _DONE:
+                    break
+                yield token
+        finally:
+            self.cancel(turn)
+
+    def cancel(self, turn):
+        """Cancels one turn unless it is already being persisted. Returns True if it was cancelled."""
+        with self.active_lock:
+            if turn.committing or turn.future.done():
+                return False
+            turn.cancelled = True
+        turn.future.cancel()
+        return True
+
+    def cancel_all(self, source=None):
+        """Cancels the in-flight generations of one source (all if None). Returns how many were cancelled."""
+        with self.active_lock:
+            turns = [t for t in self.active if source is None or t.source == source]
+        cancelled = sum(1 for t in turns if self.cancel(t))
+        if cancelled:
+            print(f"[LLM] Cancelled {cancelled} in-flight turn(s){f' ({source})' if source else ''}")
+        return cancelled
+
+    def close(self):
+        self.cancel_all()
+        if self.summarizer:
+            self.summarizer.stop()
+        self.loop.call_soon_threadsafe(self.loop.stop)
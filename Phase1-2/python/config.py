@@ -18,16 +18,96 @@ WAKE_WORD_THRESHOLD = 0.35
 SILENCE_THRESHOLD = 0.003
 SILENCE_DURATION = 3.0
 
+# Speech-to-Text
+STT_STREAMING = True         # Transcribe while the user speaks; only the tail is decoded at the end
+STT_STREAM_INTERVAL = 0.6    # Seconds of new audio between incremental passes
+STT_STREAM_BEAM = 1          # Beam size for incremental passes (final tail uses 5)
+STT_STREAM_MAX_WINDOW = 12.0 # Seconds of audio re-decoded per pass before trimming at committed words
+
 # LLM Backend
 LLM_MODEL = "llama3.2:3b"
-LLM_HOST = "http://localhost:11434"
+LLM_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")  # Env override, e.g. a mock server
+LLM_KEEP_ALIVE = "30m"  # Keep the model (and its KV cache) resident between turns
+LLM_HISTORY_MAX = 6     # Max history messages sent with a prompt
+LLM_HISTORY_STEP = 4    # History window start advances in blocks of this many messages
+LLM_NUM_CTX = 4096      # Context window requested from Ollama
+LLM_NUM_PREDICT = 100   # Max reply tokens (also reserved out of the context window)
+LLM_REQUEST_TIMEOUT = 60      # Seconds before a blocking request is abandoned
+LLM_FIRST_TOKEN_TIMEOUT = 30  # Seconds to wait for the first token (includes prompt eval)
+LLM_TOKEN_TIMEOUT = 10        # Max silence between streamed tokens
+
+# Intent Routing
+INTENT_THRESHOLD = 0.45          # Min prototype similarity for chit-chat / knowledge
+INTENT_COMMAND_THRESHOLD = 0.6   # Stricter bar for intents that trigger actions
+
+# Semantic Response Cache
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_THRESHOLD = 0.95  # Cosine similarity for a query to count as a repeat
+RESPONSE_CACHE_SIZE = 128        # Cached answers (LRU beyond this)
+RESPONSE_CACHE_TTL = 300         # Seconds a cached answer stays valid
+
+# Prompt Token Budgets (per section, in tokens)
+PROMPT_BUDGET_HISTORY = 1200
+PROMPT_BUDGET_FILES = 300
+PROMPT_BUDGET_KNOWLEDGE = 800
+PROMPT_BUDGET_SUMMARY = 300
+
+# Conversation History
+MEMORY_TAIL_MESSAGES = 200     # Newest messages kept in RAM; older ones are read from disk
+MEMORY_SEGMENT_MESSAGES = 1000 # Messages per gzip archive segment rotated out of the active file
+MEMORY_WRITE_WINDOW = 0.2      # Seconds new messages wait to be coalesced into one fsync'd write
+
+# Rolling Conversation Summary
+SUMMARY_ENABLED = True
+SUMMARY_KEEP_RECENT = 2   # Newest messages always sent verbatim (the last turn)
+SUMMARY_FOLD_BATCH = 12   # Fold older messages into the summary once this many pile up
+SUMMARY_IDLE_SECONDS = 20 # Fold only after this long with no turn in flight (never competes with a reply)
+SUMMARY_MAX_WORDS = 150   # Target length of the running summary
+
+# Embeddings
+EMBEDDING_BACKEND = "sentence_transformers"  # or "onnx_int8" (quantized ONNX Runtime, CPU-friendly)
+EMBEDDING_THREADS = 0                        # CPU threads for inference; 0 = library default
+
+# RAG Indexing
+RAG_CHUNK_SIZE = 800      # Characters per indexed chunk
+RAG_CHUNK_OVERLAP = 150   # Characters shared between neighbouring chunks
+RAG_EMBED_BATCH_SIZE = 32 # Documents per embedding forward pass
+RAG_UPSERT_MAX_BATCH = 5000 # Stay under Chroma's per-call upsert limit
+RAG_QUERY_CACHE_SIZE = 256  # Cached query embeddings / retrieval results
+RAG_QUERY_CACHE_TTL = 600   # Seconds before a cached retrieval result expires
+RAG_IGNORE_PATTERNS = [".*", "__pycache__", "*.tmp", "~$*"]  # Names skipped by folder sync
+
+# RAG Retrieval
+RAG_RETRIEVAL_MODE = "hybrid"  # "vector", "lexical" or "hybrid" (BM25 + dense, rank-fused)
+RAG_HYBRID_CANDIDATES = 10     # Candidates per retriever before fusion
+RAG_RRF_K = 60                 # Reciprocal rank fusion damping constant
+RAG_MAX_DISTANCE = 0.7         # Cosine distance (1 - cos) above which a chunk is irrelevant
+RAG_LEXICAL_MIN_RATIO = 0.3    # Lexical-only mode: drop chunks scoring below this fraction of the best BM25 score
+RAG_MMR_LAMBDA = 0.7           # MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity
+RAG_CONTEXT_CHAR_BUDGET = 2400 # Max characters of retrieved context (~600 tokens)
+
+# Background Indexing (write-behind)
+INDEX_QUEUE_MAX = 1000    # Pending jobs before new ones are dropped
+INDEX_BATCH_SIZE = 64     # Jobs drained per micro-batch
+INDEX_BATCH_WAIT = 0.25   # Seconds to wait for a micro-batch to fill
+
+# Memory Compaction ("Interaction:" documents)
+MEMORY_COMPACT_INTERVAL = 600  # Seconds between background passes
+MEMORY_DUP_THRESHOLD = 0.92    # Cosine similarity treated as a near-duplicate
+MEMORY_TTL_DAYS = 90           # Memories older than this are dropped
+MEMORY_MAX_DOCS = 2000         # Newest memories kept beyond that are evicted
 
 # Path Management
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# Data is now stored in the sibling 'data' directory
-DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "SIRKIT_DATA"))
+# Data is now stored in the sibling 'data' directory (SIRKIT_DATA_DIR overrides, e.g. for benchmarks)
+DATA_DIR = os.environ.get("SIRKIT_DATA_DIR") or os.path.abspath(os.path.join(BASE_DIR, "..", "data", "SIRKIT_DATA"))
 VECTOR_DB_DIR = os.path.join(DATA_DIR, "vector_db")
+# Lives inside the vector store, so deleting vector_db also forgets what was indexed
+INDEX_MANIFEST_PATH = os.path.join(VECTOR_DB_DIR, "index_manifest.json")
 IMAGES_DIR = os.path.join(DATA_DIR, "images")
+ONNX_MODEL_DIR = os.path.join(DATA_DIR, "models", "all-MiniLM-L6-v2-onnx")
+# Optional HF tokenizer.json for the chat model; token counts are estimated without it
+LLM_TOKENIZER_PATH = os.path.join(DATA_DIR, "models", "llama3.2-tokenizer.json")
 TESTER_DIR = os.path.join(IMAGES_DIR, "tester")
 
 # Ensure directories exist
@@ -0,0 +1,164 @@
+"""
+SIGNIFICANCE:
+Keeps long sessions cheap to prompt. Once older turns pile up and the
+assistant has been idle for a while, a background job asks the LLM to fold
+them into a compact running summary, stored next to the conversation history.
+A fold is aborted as soon as a new turn starts, so it never competes with a
+reply for Ollama. Prompts then carry the summary plus only the last
+couple of raw turns, so token cost stays flat as the session grows while
+long-range context (names, decisions, preferences) is kept.
+"""
+
+import json
+import os
+import threading
+import time
+import config
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain the running summary of a conversation between a user and SIRKIT, "
+    "a local voice assistant. Merge the new messages into the existing summary. "
+    "Keep names, facts, decisions, preferences and open questions; drop greetings and small talk. "
+    "Reply with the updated summary only, in plain sentences, under {words} words."
+)
+
+class ConversationSummarizer:
+    def __init__(self, memory, client, filename="conversation_summary.json"):
+        self.memory = memory
+        self.client = client  # ollama.Client shared with the LLMClient
+        self.path = os.path.join(config.DATA_DIR, filename)
+        self.lock = threading.Lock()
+        state = self._load()
+        self.summary = state.get("summary", "")
+        self.covered = state.get("covered", 0)  # History messages already folded into the summary
+        self.clears_seen = memory.clears
+        self.turns_in_flight = 0
+        self.last_activity = time.monotonic()
+        self.wake_event = threading.Event()
+        self.abort_event = threading.Event()  # Set when a turn starts during a fold
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.folds = 0
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"(!) Conversation summary unreadable, starting fresh: {e}")
+        return {}
+
+    def _save(self):
+        """Writes the summary atomically (temp file + rename)."""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({"summary": self.summary, "covered": self.covered, "updated": time.time()}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving conversation summary: {e}")
+
+    def start(self):
+        if self.thread and self.thread.is_alive(): return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.abort_event.set()
+        self.wake_event.set()
+
+    def turn_started(self):
+        """Called when a turn begins: postpones folding and aborts a fold in progress."""
+        with self.lock:
+            self.turns_in_flight += 1
+            self.last_activity = time.monotonic()
+            self.abort_event.set()
+
+    def turn_finished(self):
+        """Called when a turn ends (completed, failed or cancelled); folding happens once idle."""
+        with self.lock:
+            self.turns_in_flight = max(0, self.turns_in_flight - 1)
+            self.last_activity = time.monotonic()
+        self.wake_event.set()
+
+    def _wait_until_idle(self):
+        """Blocks until no turn has been in flight for SUMMARY_IDLE_SECONDS. False if stopped."""
+        while not self.stop_event.is_set():
+            with self.lock:
+                idle_for = time.monotonic() - self.last_activity
+                if not self.turns_in_flight and idle_for >= config.SUMMARY_IDLE_SECONDS:
+                    self.abort_event.clear()
+                    return True
+            self.stop_event.wait(max(0.1, config.SUMMARY_IDLE_SECONDS - idle_for))
+        return False
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait()
+            self.wake_event.clear()
+            if not self._wait_until_idle():
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"(!) Conversation summary error: {e}")
+
+    def state(self):
+        """(summary, covered) snapshot for prompt building."""
+        with self.lock:
+            total = self.memory.message_count()
+            if self.memory.clears != self.clears_seen or self.covered > total:  # History was cleared
+                self.clears_seen = self.memory.clears
+                if self.summary or self.covered:
+                    self.summary, self.covered = "", 0
+                    self._save()
+            return self.summary, self.covered
+
+    def run_once(self):
+        """Folds everything except the last SUMMARY_KEEP_RECENT messages, if enough has piled up."""
+        summary, covered = self.state()
+        end = self.memory.message_count() - config.SUMMARY_KEEP_RECENT
+        if end - covered < config.SUMMARY_FOLD_BATCH:
+            return False
+
+        messages = self.memory.get_messages(covered, end)
+        transcript = "\n".join(
+            f"{'User' if m['role'] == 'user' else 'SIRKIT'}: {m['content']}" for m in messages
+        )
+        start = time.perf_counter()
+        # Streamed so a turn starting mid-fold can abort it (closing the stream stops generation)
+        stream = self.client.chat(
+            model=config.LLM_MODEL,
+            messages=[
+                {'role': 'system', 'content': SUMMARY_INSTRUCTIONS.format(words=config.SUMMARY_MAX_WORDS)},
+                {'role': 'user', 'content': f"Existing summary:\n{summary or '(none yet)'}\n\nNew messages:\n{transcript}"},
+            ],
+            stream=True,
+            keep_alive=config.LLM_KEEP_ALIVE,
+            options={"temperature": 0.2, "num_predict": config.SUMMARY_MAX_WORDS * 2}
+        )
+        pieces = []
+        try:
+            for chunk in stream:
+                if self.abort_event.is_set():
+                    print("[Memory] Summary fold aborted: a new turn started")
+                    return False
+                pieces.append(chunk['message']['content'])
+        finally:
+            stream.close()
+        new_summary = "".join(pieces).strip()
+        if not new_summary:
+            return False
+
+        with self.lock:
+            if self.covered != covered:  # Cleared or folded elsewhere meanwhile
+                return False
+            self.summary, self.covered = new_summary, end
+            self._save()
+        self.folds += 1
+        print(f"[Memory] Folded {len(messages)} messages into the summary in {time.perf_counter() - start:.2f}s "
+              f"({len(new_summary)} chars, {end} messages covered)")
+        return True
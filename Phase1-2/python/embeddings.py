@@ -0,0 +1,95 @@
+"""
+SIGNIFICANCE:
+Pluggable embedding backends for the RAG engine. The default runs
+all-MiniLM-L6-v2 through Sentence-Transformers (torch, fp32). The 'onnx_int8'
+backend runs the same model through ONNX Runtime with a dynamically
+int8-quantized graph, which is lighter and faster on CPU-only machines.
+Selected with config.EMBEDDING_BACKEND; threads with config.EMBEDDING_THREADS.
+"""
+
+import os
+import shutil
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils import embedding_functions
+import config
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+BACKENDS = ("sentence_transformers", "onnx_int8", "onnx")
+
+def create_embedding_function(backend=None, threads=None):
+    """Builds the embedding function for the requested backend."""
+    backend = backend or config.EMBEDDING_BACKEND
+    threads = config.EMBEDDING_THREADS if threads is None else threads
+
+    if backend == "sentence_transformers":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=MODEL_NAME)
+    if backend in ("onnx_int8", "onnx"):
+        return OnnxEmbeddingFunction(quantized=(backend == "onnx_int8"), threads=threads)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+def ensure_onnx_model(model_dir=None, quantized=True):
+    """
+    Makes sure model_dir holds tokenizer.json and the ONNX graph, returning the
+    graph path. The fp32 export is fetched through Chroma's bundled ONNX MiniLM
+    (same weights as the Sentence-Transformers model) and quantized once.
+    """
+    model_dir = model_dir or config.ONNX_MODEL_DIR
+    os.makedirs(model_dir, exist_ok=True)
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model_int8.onnx")
+    tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+
+    if not (os.path.exists(fp32_path) and os.path.exists(tokenizer_path)):
+        print(f"[Embeddings] Fetching ONNX export of {MODEL_NAME}...")
+        bundled = embedding_functions.ONNXMiniLM_L6_V2()
+        bundled(["warm up"])  # Triggers the one-time download
+        source_dir = os.path.join(str(bundled.DOWNLOAD_PATH), bundled.EXTRACTED_FOLDER_NAME)
+        shutil.copyfile(os.path.join(source_dir, "model.onnx"), fp32_path)
+        shutil.copyfile(os.path.join(source_dir, "tokenizer.json"), tokenizer_path)
+
+    if not quantized:
+        return fp32_path
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print("[Embeddings] Quantizing ONNX model to int8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+class OnnxEmbeddingFunction(EmbeddingFunction):
+    """all-MiniLM-L6-v2 on ONNX Runtime: mean pooling + L2 normalisation."""
+
+    def __init__(self, model_dir=None, quantized=True, threads=0, max_length=256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir or config.ONNX_MODEL_DIR
+        model_path = ensure_onnx_model(self.model_dir, quantized)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, input):
+        encodings = self.tokenizer.encode_batch(list(input))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return [row for row in pooled.astype(np.float32)]
@@ -3,11 +3,14 @@ import threading
 import time
 from watchfiles import watch, Change
 import config
+from index_worker import get_index_worker
 
 class FileMonitor:
-    def __init__(self, target_dir, rag_engine, on_change_callback=None):
+    def __init__(self, target_dir, rag_engine, on_change_callback=None, indexer=None):
         self.target_dir = os.path.abspath(target_dir)
         self.rag = rag_engine
+        # Indexing happens on the write-behind worker, not the watcher thread
+        self.indexer = indexer or get_index_worker()
         self.on_change_callback = on_change_callback
         self.running = False
         self.thread = None
@@ -26,6 +29,8 @@ class FileMonitor:
         for changes in watch(self.target_dir):
             if not self.running: break
             
+            # Files added/modified in this batch are embedded together afterwards
+            to_index = []
             for change_type, path in changes:
                 path = os.path.abspath(path)
                 filename = os.path.basename(path)
@@ -37,37 +42,29 @@ class FileMonitor:
                 if change_type == Change.added:
                     print(f"[Monitor] Added: {filename}")
                     if os.path.isfile(path):
-                        content = self.rag._read_file_content(path)
-                        if content:
-                            self.rag.add_text(
-                                f"Content of file '{filename}':\n{content[:2000]}",
-                                metadata={"type": "file_content", "filename": filename, "path": path},
-                                doc_id=f"file_content_{filename}"
-                            )
+                        to_index.append(path)
                 
                 elif change_type == Change.deleted:
                     print(f"[Monitor] Deleted: {filename}")
-                    self.rag.delete_file_content(filename)
+                    self.indexer.delete_file(path)
                 
                 elif change_type == Change.modified:
                     print(f"[Monitor] Modified: {filename}")
                     if os.path.isfile(path):
-                        content = self.rag._read_file_content(path)
-                        if content:
-                            self.rag.add_text(
-                                f"Content of file '{filename}':\n{content[:2000]}",
-                                metadata={"type": "file_content", "filename": filename, "path": path},
-                                doc_id=f"file_content_{filename}"
-                            )
+                        to_index.append(path)
 
                 # Trigger UI refresh if callback exists
                 if self.on_change_callback:
                     self.on_change_callback(change_type.name, filename)
 
+            if to_index:
+                # index_files drops each file's stale chunks before re-adding
+                self.indexer.index_files(dict.fromkeys(to_index))
+
 if __name__ == "__main__":
     # Test stub
-    from rag_engine import RAGEngine
-    r = RAGEngine()
+    from rag_engine import get_rag_engine
+    r = get_rag_engine()
     fm = FileMonitor(config.IMAGES_DIR, r, lambda t, f: print(f"UI Callback: {t} {f}"))
     fm.start()
     try:
@@ -0,0 +1,142 @@
+"""
+SIGNIFICANCE:
+Full-text index over every conversation message (SQLite FTS5), kept next to
+the history by MemoryManager. Questions like "what did I ask yesterday about
+the garden" become a keyword lookup with role and time filters that takes
+milliseconds, instead of a dense search across mixed file and memory
+documents in the vector store.
+"""
+
+import datetime
+import re
+import sqlite3
+import threading
+import time
+
+WORD_RE = re.compile(r"[\w']+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "with", "about", "from",
+    "is", "are", "was", "were", "be", "been", "do", "did", "does", "i", "me", "my", "you", "your",
+    "we", "us", "it", "that", "this", "what", "when", "which", "who", "how", "ask", "asked", "say",
+    "said", "tell", "told", "talk", "talked", "mention", "mentioned", "remind", "again", "earlier",
+    "ago", "last", "today", "yesterday", "week", "month", "morning", "evening", "night",
+    "can", "could", "would", "please", "whether", "we're", "i'm", "you're",
+}
+
+def parse_time_window(text, now=None):
+    """(since, until) epoch seconds for phrases like 'yesterday' or 'last week'; (None, None) otherwise."""
+    now = now or time.time()
+    lowered = text.lower()
+    midnight = datetime.datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    if "yesterday" in lowered:
+        return midnight - 86400, midnight
+    if "today" in lowered or "this morning" in lowered or "earlier" in lowered:
+        return midnight, None
+    if "last week" in lowered or "this week" in lowered:
+        return now - 7 * 86400, None
+    if "last month" in lowered or "this month" in lowered:
+        return now - 30 * 86400, None
+    return None, None
+
+def parse_role(text):
+    """'what did I ask/say' -> user, 'what did you say/tell me' -> assistant, else None."""
+    lowered = text.lower()
+    if re.search(r"\b(i|me)\s+(ask|asked|say|said|tell|told|mention|mentioned)\b", lowered):
+        return "user"
+    if re.search(r"\byou\s+(say|said|tell|told|answer|answered|suggest|suggested)\b", lowered):
+        return "assistant"
+    return None
+
+def keywords(text):
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+class HistoryIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # Written by the history writer thread, searched from the chat thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(content, role UNINDEXED, ts UNINDEXED)"
+            )
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: same table, LIKE scans instead of an index
+            print(f"(!) FTS5 unavailable, history search falls back to scanning: {e}")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (rowid INTEGER PRIMARY KEY, content TEXT, role TEXT, ts REAL)"
+            )
+            self.fts = False
+        self.conn.commit()
+
+    def add(self, records):
+        """Indexes (position, record) pairs; the position is the rowid, so re-adding is idempotent."""
+        rows = [(n, r.get("content", ""), r.get("role", ""), r.get("ts") or 0.0) for n, r in records]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO messages(rowid, content, role, ts) VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def next_position(self):
+        """Position after the newest indexed message."""
+        with self.lock:
+            last = self.conn.execute("SELECT MAX(rowid) FROM messages").fetchone()[0]
+        return 0 if last is None else last + 1
+
+    def delete_from(self, position):
+        with self.lock:
+            self.conn.execute("DELETE FROM messages WHERE rowid >= ?", (position,))
+            self.conn.commit()
+
+    def search(self, query, role=None, since=None, until=None, limit=5):
+        """
+        Messages containing every keyword of `query` (best BM25 match first),
+        optionally filtered by role and a [since, until) time window. With no
+        keywords, the newest messages matching the filters are returned.
+        Returns dicts with n, role, ts, content.
+        """
+        words = keywords(query)
+        filters, params = [], []
+        if role:
+            filters.append("role = ?")
+            params.append(role)
+        if since is not None:
+            filters.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            filters.append("ts < ?")
+            params.append(until)
+
+        if not words:
+            # "What did I ask yesterday?": no keywords, newest messages in the window
+            if not filters:
+                return []
+            sql = "SELECT rowid, role, ts, content FROM messages WHERE " + " AND ".join(filters)
+            sql += " ORDER BY rowid DESC LIMIT ?"
+            with self.lock:
+                rows = self.conn.execute(sql, params + [limit]).fetchall()
+            return [{"n": n, "role": r, "ts": ts, "content": c} for n, r, ts, c in reversed(rows)]
+
+        if self.fts:
+            match = " ".join('"' + w.replace('"', '""') + '"' for w in words)
+            sql = "SELECT rowid, role, ts, content FROM messages WHERE messages MATCH ?"
+            params.insert(0, match)
+            order = " ORDER BY rank, rowid DESC"  # Newest first among equal matches
+        else:
+            sql = "SELECT rowid, role, ts, content FROM messages WHERE " + " AND ".join(["content LIKE ?"] * len(words))
+            params[:0] = [f"%{w}%" for w in words]
+            order = " ORDER BY rowid DESC"
+        sql += "".join(" AND " + f for f in filters) + order + " LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{"n": n, "role": r, "ts": ts, "content": c} for n, r, ts, c in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,112 @@
+"""
+SIGNIFICANCE:
+Keeps a persistent manifest of what the RAG index already holds for each file
+(size, mtime, content hash and the chunk ids it produced). Folder syncs use it
+to diff the file system against the index so that unchanged files are never
+re-read or re-embedded.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import config
+
+def hash_file(file_path, block_size=65536):
+    """Streams a file through SHA-1 and returns the hex digest."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_text(text):
+    return hashlib.sha1(text.encode('utf-8', errors='ignore')).hexdigest()
+
+LISTING_PREFIX = "folder_list::"
+
+def listing_key(directory):
+    """Manifest key of a folder's listing document."""
+    return LISTING_PREFIX + directory
+
+class IndexManifest:
+    def __init__(self, path=None):
+        self.path = path or config.INDEX_MANIFEST_PATH
+        self.lock = threading.RLock()
+        self.entries = self._load()
+        self.dirty = False
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                # A lost manifest only costs one full re-index
+                print(f"(!) Index manifest unreadable, rebuilding: {e}")
+        return {}
+
+    def save(self):
+        """Writes the manifest atomically (temp file + rename)."""
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except Exception as e:
+                print(f"Error saving index manifest: {e}")
+
+    def get(self, path):
+        with self.lock:
+            return self.entries.get(path)
+
+    def set(self, path, size, mtime, content_hash, chunk_ids):
+        with self.lock:
+            self.entries[path] = {
+                "size": size,
+                "mtime": mtime,
+                "hash": content_hash,
+                "chunk_ids": list(chunk_ids),
+            }
+            self.dirty = True
+
+    def touch(self, path, size, mtime):
+        """Refreshes stat info for a file whose content hash did not change."""
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry:
+                entry["size"], entry["mtime"] = size, mtime
+                self.dirty = True
+
+    def remove(self, path):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.dirty = True
+            return entry
+
+    def chunk_ids(self):
+        """{path: chunk ids} snapshot of every entry."""
+        with self.lock:
+            return {p: list(e.get("chunk_ids", [])) for p, e in self.entries.items()}
+
+    def paths_under(self, directory):
+        """Indexed file paths anywhere below `directory`."""
+        prefix = os.path.join(directory, "")
+        with self.lock:
+            return [p for p in self.entries if p.startswith(prefix)]
+
+    def listings_under(self, directory):
+        """Folder-listing keys for `directory` itself and every folder below it."""
+        key = listing_key(directory)
+        prefix = os.path.join(key, "")
+        with self.lock:
+            return [k for k in self.entries if k == key or k.startswith(prefix)]
+
+    @staticmethod
+    def stat_matches(entry, size, mtime):
+        return entry is not None and entry.get("size") == size and entry.get("mtime") == mtime
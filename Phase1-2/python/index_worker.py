@@ -0,0 +1,148 @@
+"""
+SIGNIFICANCE:
+Write-behind indexing for the RAG engine. Chat turns and file-system events
+enqueue work here instead of embedding inline, so the user never waits on the
+embedding model or a vector-db write. A single background thread drains the
+bounded queue in micro-batches and flushes everything on shutdown.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+import config
+from rag_engine import get_rag_engine
+
+_worker_lock = threading.Lock()
+_shared_worker = None
+
+def get_index_worker():
+    """Process-wide, already-started indexing worker bound to the shared RAGEngine."""
+    global _shared_worker
+    with _worker_lock:
+        if _shared_worker is None:
+            _shared_worker = IndexWorker(get_rag_engine())
+            _shared_worker.start()
+        return _shared_worker
+
+class IndexWorker:
+    def __init__(self, rag_engine, max_queue=None, batch_size=None, batch_wait=None):
+        self.rag = rag_engine
+        self.queue = queue.Queue(maxsize=max_queue or config.INDEX_QUEUE_MAX)
+        self.batch_size = batch_size or config.INDEX_BATCH_SIZE
+        self.batch_wait = config.INDEX_BATCH_WAIT if batch_wait is None else batch_wait
+        self.running = False
+        self.thread = None
+        self.processed = 0
+        self.dropped = 0
+        self.last_lag = 0.0  # Seconds between enqueue and indexing of the last batch
+        atexit.register(self.stop)  # Drain queued jobs even if the caller never calls stop()
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stops the worker after everything already queued has been indexed."""
+        if not self.running: return
+        self.running = False
+        self.thread.join(timeout)
+
+    def add_text(self, text, metadata=None, doc_id=None):
+        """Queues a document for indexing."""
+        self._put(("doc", (text, metadata, doc_id)))
+
+    def index_files(self, file_paths):
+        """Queues files for (re)indexing."""
+        self._put(("files", list(file_paths)))
+
+    def delete_file(self, file_path):
+        self._put(("delete", file_path))
+
+    def _put(self, job):
+        try:
+            self.queue.put_nowait((job, time.monotonic()))
+        except queue.Full:
+            # Never block a chat turn on indexing back-pressure
+            self.dropped += 1
+            print(f"(!) Index queue full, dropped {job[0]} job")
+
+    def flush(self, timeout=10.0):
+        """Blocks until all queued jobs have been processed."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stats(self):
+        """Queue depth, throughput counters and indexing lag in seconds."""
+        with self.queue.mutex:
+            oldest = self.queue.queue[0][1] if self.queue.queue else None
+        return {
+            "depth": self.queue.qsize(),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "lag": self.last_lag,
+            "oldest_pending_age": time.monotonic() - oldest if oldest is not None else 0.0,
+        }
+
+    def _run(self):
+        # Keep draining after stop() until the queue is empty (flush-on-shutdown)
+        while self.running or not self.queue.empty():
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Micro-batch: gather whatever else arrives within batch_wait
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0.001)))
+                except queue.Empty:
+                    break
+
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"(!) Index worker error: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _process(self, batch):
+        texts, metadatas, ids = [], [], []
+        file_events = {}  # path -> "files" or "delete"; the last event per path wins
+        oldest = min(enqueued for _, enqueued in batch)
+        for (kind, payload), _ in batch:
+            if kind == "doc":
+                texts.append(payload[0])
+                metadatas.append(payload[1])
+                ids.append(payload[2])
+            elif kind == "files":
+                for path in map(os.path.abspath, payload):
+                    file_events.pop(path, None)
+                    file_events[path] = "files"
+            elif kind == "delete":
+                path = os.path.abspath(payload)
+                # A deleted folder cancels earlier updates of files beneath it
+                prefix = os.path.join(path, "")
+                for stale in [p for p in file_events if p == path or p.startswith(prefix)]:
+                    del file_events[stale]
+                file_events[path] = "delete"
+
+        if texts:
+            self.rag.add_texts(texts, metadatas=metadatas, ids=ids)
+        # Once collapsed, every surviving update is newer than any delete it overlaps, so deletes go first
+        for path, kind in file_events.items():
+            if kind == "delete":
+                self.rag.delete_file_content(path)
+        file_paths = [path for path, kind in file_events.items() if kind == "files"]
+        if file_paths:
+            self.rag.index_files(file_paths)
+
+        self.processed += len(batch)
+        self.last_lag = time.monotonic() - oldest
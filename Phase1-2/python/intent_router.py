@@ -0,0 +1,94 @@
+"""
+SIGNIFICANCE:
+Decides what kind of turn an utterance is before anything expensive runs.
+Each utterance is scored against a few prototype phrases per intent (camera
+on/off, click, stop, chit-chat, recall of past conversation, knowledge query)
+using the shared embedding model, so voice commands are handled without the
+LLM and only knowledge and recall queries pay for retrieval. Query embeddings go through RAGEngine's cache,
+so a routed knowledge query is not embedded a second time by retrieval.
+"""
+
+from collections import namedtuple
+import numpy as np
+import config
+from lexical_index import TOKEN_RE, is_identifier
+from rag_engine import normalize_query
+
+Intent = namedtuple("Intent", ["name", "score", "retrieve"])
+
+INTENT_PROTOTYPES = {
+    "camera_on": [
+        "capture", "start the camera", "turn on the camera", "activate camera mode",
+        "open the camera", "switch the camera on",
+    ],
+    "camera_off": [
+        "decapture", "stop the camera", "turn off the camera", "deactivate camera mode",
+        "close the camera", "switch the camera off",
+    ],
+    "click": [
+        "click", "take a picture", "take a photo", "click a picture", "snap a photo", "take a snapshot",
+    ],
+    "stop": [
+        "stop", "exit", "goodbye", "that's all", "thank you", "go to sleep", "we're done",
+    ],
+    "chit_chat": [
+        "hello", "hi", "hi there", "how are you", "who are you", "tell me a joke", "good morning",
+        "what's up", "nice to meet you", "what can you do",
+    ],
+    "recall": [
+        "what did I ask you yesterday", "what did we talk about earlier", "what did you tell me about",
+        "remind me what I said about", "did I mention", "what was my last question",
+    ],
+    "knowledge": [
+        "what did I say about", "what do you remember about", "what's in my notes about",
+        "find the document about", "summarise my files", "what is in this folder",
+        "which photos did I take", "what was decided in the meeting",
+    ],
+}
+
+COMMAND_INTENTS = {"camera_on", "camera_off", "click", "stop"}
+RETRIEVAL_INTENTS = {"knowledge", "recall"}
+FALLBACK_INTENT = "knowledge"  # Unsure: answer with retrieval, as before routing existed
+
+class IntentRouter:
+    def __init__(self, rag):
+        self.rag = rag
+        self.threshold = config.INTENT_THRESHOLD
+        self.command_threshold = config.INTENT_COMMAND_THRESHOLD
+        self.exact = {normalize_query(p): name for name, phrases in INTENT_PROTOTYPES.items() for p in phrases}
+
+        # All prototypes embedded in one batch, stored as unit rows
+        phrases = [p for ps in INTENT_PROTOTYPES.values() for p in ps]
+        self.labels = [name for name, ps in INTENT_PROTOTYPES.items() for _ in ps]
+        matrix = np.asarray(rag.embedding_fn(phrases), dtype=np.float32)
+        self.prototypes = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    def route(self, text):
+        """Returns the Intent (name, score, retrieve) for an utterance."""
+        key = normalize_query(text)
+        if not key:
+            return Intent("chit_chat", 0.0, False)
+        if key in self.exact:
+            return self._intent(self.exact[key], 1.0)
+        # Filenames, ids and long numbers are lookups, whatever words surround them
+        if any(is_identifier(t) for t in TOKEN_RE.findall(key)):
+            return self._intent("knowledge", 1.0)
+
+        query = np.asarray(self.rag.embed_query(text), dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        sims = self.prototypes @ query
+
+        scores = {}
+        for label, sim in zip(self.labels, sims):
+            scores[label] = max(scores.get(label, -1.0), float(sim))
+        name, score = max(scores.items(), key=lambda item: item[1])
+
+        # Commands act on the world, so they need a closer match than conversation
+        needed = self.command_threshold if name in COMMAND_INTENTS else self.threshold
+        if score < needed:
+            return self._intent(FALLBACK_INTENT, score)
+        return self._intent(name, score)
+
+    @staticmethod
+    def _intent(name, score):
+        return Intent(name, score, name in RETRIEVAL_INTENTS)
@@ -0,0 +1,120 @@
+"""
+SIGNIFICANCE:
+In-process BM25 inverted index kept alongside the Chroma collection.
+Dense embeddings are poor at exact identifiers (filenames like
+'capture_20260203_170121.jpg', ids, numbers); this index catches them
+and lets RAGEngine answer such lookups without running the embedding model.
+"""
+
+import math
+import re
+import heapq
+import threading
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+SPLIT_RE = re.compile(r"[._\-]")
+ORDINAL_RE = re.compile(r"\d+(?:st|nd|rd|th|s)")
+
+def tokenize(text):
+    """
+    Lowercased alphanumeric tokens. Compound identifiers are kept whole and
+    also split into their parts, so 'capture_20260203.jpg' matches both the
+    exact name and '20260203'.
+    """
+    tokens = []
+    for match in TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        if SPLIT_RE.search(match):
+            tokens.extend(part for part in SPLIT_RE.split(match) if part)
+    return tokens
+
+def is_identifier(token):
+    """
+    Tokens that dense retrieval tends to miss: compound names ('capture_0203.jpg',
+    'note-0042'), letters mixed with digits ('v2', 'x86') and long numbers.
+    Small numbers and ordinals ('top 3', '2nd') are ordinary words.
+    """
+    if SPLIT_RE.search(token):
+        return True
+    digits = sum(c.isdigit() for c in token)
+    if digits == len(token):
+        return digits >= 4
+    return digits > 0 and not ORDINAL_RE.fullmatch(token)
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses several ranked id lists; ids ranked high in any list float up.
+    Returns (doc_id, fused score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.RLock()
+        self.postings = {}   # term -> {doc_id: term frequency}
+        self.doc_terms = {}  # doc_id -> distinct terms (for removal)
+        self.doc_len = {}
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, doc_id, text):
+        counts = Counter(tokenize(text))
+        with self.lock:
+            self.remove(doc_id)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            self.doc_terms[doc_id] = list(counts)
+            length = sum(counts.values())
+            self.doc_len[doc_id] = length
+            self.total_len += length
+
+    def remove(self, doc_id):
+        with self.lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            for term in terms:
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del self.postings[term]
+            self.total_len -= self.doc_len.pop(doc_id, 0)
+
+    def contains_term(self, term):
+        with self.lock:
+            return term in self.postings
+
+    def docs_with_terms(self, terms):
+        """Ids of documents containing at least one of `terms`."""
+        with self.lock:
+            return {doc_id for term in terms for doc_id in self.postings.get(term, ())}
+
+    def search(self, query_text, k=10):
+        """Returns up to k (doc_id, score) pairs, best first."""
+        terms = set(tokenize(query_text))
+        with self.lock:
+            n_docs = len(self.doc_len)
+            if not n_docs or not terms:
+                return []
+            avgdl = self.total_len / n_docs
+            scores = {}
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                df = len(docs)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
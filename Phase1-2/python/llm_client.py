@@ -6,69 +6,277 @@ It integrates Short-Term Memory (session history) and Long-Term Memory (RAG)
 to provide context-aware, realistic, and persistent responses.
 """
 
+import asyncio
+import time
+from collections import deque
+import httpx
 import ollama
 import config
-from rag_engine import RAGEngine
+from rag_engine import get_rag_engine
+from index_worker import get_index_worker
 from memory_manager import MemoryManager
+from token_budget import PromptBudget
+from response_cache import SemanticResponseCache, is_follow_up
+from index_manifest import hash_text
+from intent_router import IntentRouter
+from conversation_summarizer import ConversationSummarizer
+from history_search import parse_time_window, parse_role
+
+# Fixed persona: kept byte-identical across turns so Ollama can reuse its KV cache
+SYSTEM_PERSONA = (
+    "You are SIRKIT, a lightning-fast local voice assistant. "
+    "Be extremely concise. Use 1-2 short sentences unless detail is requested. "
+    "Your personality is sharp, helpful, and realistic."
+)
+
+def describe_llm_error(error):
+    """Short, speakable explanation of why a generation failed."""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return "That took too long, so I stopped. Please try again."
+    if isinstance(error, (ConnectionError, httpx.ConnectError)):
+        return "I can't reach Ollama. Check that it's running."
+    if isinstance(error, ollama.ResponseError):
+        return f"The model returned an error: {error.error}"
+    return "Brain sync error. Check Ollama."
 
 class LLMClient:
     def __init__(self):
-        self.rag = RAGEngine()
+        self.rag = get_rag_engine() # Shared with the file monitor
+        self.indexer = get_index_worker()
         self.memory = MemoryManager()
         self.current_files_context = "" # Live context from GUI
+        # Prompt-eval accounting (how much of each prompt Ollama had to re-evaluate)
+        self.prompt_turns = deque(maxlen=100)
+        self.prompt_tokens_total = 0
+        self.prompt_tokens_evaluated = 0
+        self.ttft_samples = deque(maxlen=100)  # Seconds from request to first reply token
+        self.warmup_stats = {}
+        self.budget = PromptBudget()
+        self.response_cache = SemanticResponseCache(self.rag.embed_query) if config.RESPONSE_CACHE_ENABLED else None
+        self.router = IntentRouter(self.rag)
+        self.client = ollama.Client(host=config.LLM_HOST, timeout=config.LLM_REQUEST_TIMEOUT)
+        self.summarizer = None
+        if config.SUMMARY_ENABLED:
+            self.summarizer = ConversationSummarizer(self.memory, self.client)
+            self.summarizer.start()
 
     def set_files_context(self, context_text):
+        if self.response_cache and context_text != self.current_files_context:
+            self.response_cache.invalidate()
         self.current_files_context = context_text
     
-    def chat(self, user_text):
-        if not user_text: return ""
-        
-        # Performance: Skip RAG for tiny/generic queries
+    def chat(self, user_text, intent=None):
+        """Blocking convenience wrapper around chat_stream."""
+        return "".join(self.chat_stream(user_text, intent))
+
+    def chat_stream(self, user_text, intent=None):
+        """
+        Yields the reply piece by piece as Ollama generates it. The turn is
+        persisted to memory/RAG once the stream has been fully consumed.
+        `intent` is the caller's IntentRouter result, if it already routed the text.
+        """
+        if not user_text: return
+        self._turn_started()
+        try:
+            messages, context_hash, cached = self._prepare_turn(user_text, intent)
+            if cached is not None:
+                yield cached
+                self._record_turn(user_text, cached)
+                return
+
+            pieces = []
+            start = time.perf_counter()
+            try:
+                # options can help with speed/performance depending on backend
+                stream = self.client.chat(
+                    model=config.LLM_MODEL, 
+                    messages=messages,
+                    stream=True,
+                    keep_alive=config.LLM_KEEP_ALIVE,
+                    options=self._options()
+                )
+                for chunk in stream:
+                    token = chunk['message']['content']
+                    if token:
+                        if not pieces:
+                            self._record_ttft(time.perf_counter() - start)
+                        pieces.append(token)
+                        yield token
+                    if chunk.get('done'):
+                        self._record_prompt_eval(messages, chunk)
+            except Exception as e:
+                print(f"LLM Error: {e}")
+                if not pieces:
+                    yield describe_llm_error(e)
+                return
+
+            self._complete_turn(user_text, context_hash, "".join(pieces))
+        finally:
+            self._turn_finished()
+
+    def warm_up(self):
+        """
+        Loads the model into Ollama (held resident by keep_alive) and sends a
+        one-token priming request with the fixed persona, so the first real
+        question pays neither the model load nor the persona's prompt eval.
+        Returns the timings in seconds.
+        """
+        stats = {}
+        try:
+            start = time.perf_counter()
+            # An empty prompt only loads the model
+            self.client.generate(model=config.LLM_MODEL, prompt="", keep_alive=config.LLM_KEEP_ALIVE)
+            stats["llm_load_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            stream = self.client.chat(
+                model=config.LLM_MODEL,
+                messages=[{'role': 'system', 'content': SYSTEM_PERSONA}, {'role': 'user', 'content': 'Hi'}],
+                stream=True,
+                keep_alive=config.LLM_KEEP_ALIVE,
+                options={**self._options(), "num_predict": 1}
+            )
+            for chunk in stream:
+                if "llm_ttft_s" not in stats:
+                    stats["llm_ttft_s"] = time.perf_counter() - start
+            print(f"[LLM] Warm-up: load {stats['llm_load_s']:.2f}s, first token {stats.get('llm_ttft_s', 0):.2f}s")
+        except Exception as e:
+            print(f"(!) LLM warm-up failed: {e}")
+        self.warmup_stats = stats
+        return stats
+
+    def _record_ttft(self, seconds):
+        self.ttft_samples.append(seconds)
+        print(f"[LLM] Time to first token: {seconds:.2f}s")
+
+    def ttft_stats(self):
+        """Median / worst time-to-first-token over recent turns."""
+        samples = sorted(self.ttft_samples)
+        if not samples:
+            return {"turns": 0, "p50_s": None, "max_s": None}
+        return {"turns": len(samples), "p50_s": samples[len(samples) // 2], "max_s": samples[-1]}
+
+    def _turn_started(self):
+        if self.summarizer:
+            self.summarizer.turn_started()
+
+    def _turn_finished(self):
+        if self.summarizer:
+            self.summarizer.turn_finished()
+
+    def _options(self):
+        # limit prediction for speed; num_ctx matches the budget the prompt was fitted to
+        return {"temperature": 0.5, "num_predict": config.LLM_NUM_PREDICT, "num_ctx": config.LLM_NUM_CTX}
+
+    def _prepare_turn(self, user_text, intent=None):
+        """Builds the prompt and checks the response cache. Returns (messages, context_hash, cached reply)."""
+        messages = self._build_messages(user_text, intent)
+
+        # Near-repeat of a recent question under the same context (UI state + knowledge):
+        # answer from cache. Follow-ups depend on the history, so they bypass the cache.
+        context_hash, cached = None, None
+        if self.response_cache and not is_follow_up(user_text):
+            context_hash = hash_text(messages[-2]['content'])
+            cached = self.response_cache.lookup(user_text, context_hash)
+        return messages, context_hash, cached
+
+    def _complete_turn(self, user_text, context_hash, ai_response):
+        self._record_turn(user_text, ai_response)
+        if self.response_cache and context_hash is not None:
+            self.response_cache.store(user_text, context_hash, ai_response)
+
+    def _build_messages(self, user_text, intent=None):
+        """
+        Prefix-stable layout: fixed persona, then history, then everything that
+        changes per turn (UI state, retrieved knowledge) just before the user
+        message. Only the tail of the prompt differs between turns.
+        """
+        # Performance: only knowledge queries pay for retrieval
         rag_context = ""
-        if len(user_text.split()) > 3:
+        if intent is None:  # Not routed by the caller
+            intent = self.router.route(user_text)
+        print(f"[LLM] Intent: {intent.name} ({intent.score:.2f}){' + retrieval' if intent.retrieve else ''}")
+        if intent.name == "recall":
+            rag_context = self._recall_context(user_text)
+        if intent.retrieve and not rag_context:
             rag_context = self.rag.query(user_text)
-        
-        # Short-term context
-        recent_history = self.memory.get_recent_context(limit=5) # Reduced limit for speed
-        
-        system_prompt = (
-            "You are SIRKIT, a lightning-fast local voice assistant. "
-            "Be extremely concise. Use 1-2 short sentences unless detail is requested. "
-            "Your personality is sharp, helpful, and realistic. "
-            "Current Local UI state: " + (self.current_files_context if self.current_files_context else "No files visible.")
+
+        summary, history = self._history_window()
+        history, files_context, rag_context, summary = self.budget.fit(
+            SYSTEM_PERSONA, history, self.current_files_context, rag_context, user_text, summary=summary
         )
-        
+        volatile = "Current Local UI state: " + (files_context if files_context else "No files visible.")
         if rag_context:
-            system_prompt += f"\n\nLocal Knowledge:\n{rag_context}"
+            volatile += f"\n\nLocal Knowledge:\n{rag_context}"
 
-        messages = [{'role': 'system', 'content': system_prompt}]
-        messages.extend(recent_history)
+        messages = [{'role': 'system', 'content': SYSTEM_PERSONA}]
+        if summary:
+            # Changes only when older turns are folded in, so it stays in the cached prefix
+            messages.append({'role': 'system', 'content': f"Conversation so far: {summary}"})
+        messages.extend(history)
+        messages.append({'role': 'system', 'content': volatile})
         messages.append({'role': 'user', 'content': user_text})
+        return messages
 
-        try:
-            # options can help with speed/performance depending on backend
-            response = ollama.chat(
-                model=config.LLM_MODEL, 
-                messages=messages,
-                options={"temperature": 0.5, "num_predict": 100} # limit prediction for speed
+    def _recall_context(self, user_text):
+        """Keyword lookup in the full conversation history ('what did I ask yesterday about X')."""
+        since, until = parse_time_window(user_text)
+        hits = self.memory.search_history(user_text, role=parse_role(user_text), since=since, until=until)
+        context = ""
+        for i, hit in enumerate(hits):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(hit['ts']))
+            who = "User" if hit['role'] == 'user' else "SIRKIT"
+            context += f"\n--- Context {i+1} ---\n[{when}] {who}: {hit['content']}\n"
+        return context.strip()
+
+    def _history_window(self):
+        """
+        Returns (summary, recent messages). Messages already folded into the
+        running summary are left out; the raw window start otherwise advances
+        in LLM_HISTORY_STEP blocks rather than by one turn each time, so
+        consecutive prompts share a prefix.
+        """
+        total = self.memory.message_count()
+        overflow = max(0, total - config.LLM_HISTORY_MAX)
+        start = -(-overflow // config.LLM_HISTORY_STEP) * config.LLM_HISTORY_STEP  # Round up to a step
+        summary = ""
+        if self.summarizer:
+            summary, covered = self.summarizer.state()
+            start = max(start, covered)
+        recent = self.memory.get_messages(start) if total > start else []
+        return summary, [{'role': m['role'], 'content': m['content']} for m in recent]
+
+    def _record_prompt_eval(self, messages, final_chunk):
+        """Tracks how many prompt tokens Ollama evaluated vs. served from its cache."""
+        evaluated = final_chunk.get('prompt_eval_count') or 0
+        estimated = sum(self.budget.counter.count(m['content']) + 4 for m in messages)
+        reuse = max(0.0, 1.0 - evaluated / estimated) if estimated else 0.0
+        self.prompt_tokens_total += estimated
+        self.prompt_tokens_evaluated += evaluated
+        self.prompt_turns.append({"prompt_tokens": estimated, "evaluated": evaluated, "reuse": reuse})
+        print(f"[LLM] Prompt eval: {evaluated}/~{estimated} tokens (~{reuse:.0%} reused from KV cache)")
+
+    def prompt_cache_stats(self):
+        """Running estimate of the KV-cache hit rate over all turns."""
+        total = self.prompt_tokens_total
+        return {
+            "turns": len(self.prompt_turns),
+            "prompt_tokens": total,
+            "evaluated_tokens": self.prompt_tokens_evaluated,
+            "hit_rate": max(0.0, 1.0 - self.prompt_tokens_evaluated / total) if total else 0.0,
+        }
+
+    def _record_turn(self, user_text, ai_response):
+        # Persist turns
+        self.memory.add_message('user', user_text)
+        self.memory.add_message('assistant', ai_response)
+
+        # Index only meaningful interactions (queued, embedded in the background)
+        if len(user_text) > 10:
+            self.indexer.add_text(
+                f"Interaction: {user_text} -> {ai_response}",
+                metadata={"type": "memory", "timestamp": time.time()}
             )
-            ai_response = response['message']['content']
-            
-            # Persist turns (do this in background if possible, but for now just kept here)
-            self.memory.add_message('user', user_text)
-            self.memory.add_message('assistant', ai_response)
-            
-            # Index only meaningful interactions
-            if len(user_text) > 10:
-                self.rag.add_text(
-                    f"Interaction: {user_text} -> {ai_response}",
-                    metadata={"type": "memory"}
-                )
-            
-            return ai_response
-        except Exception as e:
-            print(f"LLM Error: {e}")
-            return "Brain sync error. Check Ollama."
 
 if __name__ == "__main__":
     client = LLMClient()
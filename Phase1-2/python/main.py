@@ -8,9 +8,13 @@ from PIL import Image, ImageTk
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
 from voice_engine import VoiceEngine
-from llm_client import LLMClient
+from async_llm_client import AsyncLLMClient
 from file_monitor import FileMonitor
 from camera_engine import CameraEngine
+from rag_engine import get_rag_engine
+from index_worker import get_index_worker
+from memory_compactor import MemoryCompactor
+from text_stream import iter_sentences
 import config
 
 class SirkitGUI:
@@ -19,6 +23,8 @@ class SirkitGUI:
         self.root.title("SIRKIT")
         self.root.geometry("1100x650")
         self.root.configure(bg="#8a8aa8")  # Main background
+        # Closing the window must flush the write-behind history/index queues like the Stop button
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
 
         # Fonts
         self.title_font = font.Font(family="Segoe UI", size=24, weight="bold")
@@ -30,10 +36,12 @@ class SirkitGUI:
         self.voice = None
         self.llm = None
         self.camera = None
+        self.compactor = None
         self.camera_session_active = False
         self.running = False
         self.current_preview_path = None
         self.current_browse_dir = config.IMAGES_DIR
+        self.reply_cancels = {}  # Source ("Voice"/"Text") -> Event that interrupts its reply
 
         self.setup_ui()
         self.refresh_file_list()
@@ -364,6 +372,36 @@ class SirkitGUI:
             self.voice.speak("I couldn't access the camera.")
         return False
 
+    def handle_command(self, intent, source="Voice"):
+        """Runs camera commands directly (no LLM). Returns True if the intent was a command."""
+        if intent.name not in ("camera_on", "camera_off", "click"):
+            return False
+        self.log(f"ACTION: {intent.name} ({source}, match {intent.score:.2f})")
+        if not self.camera:
+            self.camera = CameraEngine()
+
+        if intent.name == "camera_on":
+            if not self.camera_session_active:
+                if self.camera.start_session():
+                    self.camera_session_active = True
+                    self.voice.speak("Camera active. Say click to take photos.")
+                    self.status_var.set("Status: Camera Mode")
+                else:
+                    self.voice.speak("Failed to activate camera.")
+            else:
+                self.voice.speak("Camera is already active.")
+        elif intent.name == "camera_off":
+            if self.camera_session_active:
+                self.camera.stop_session()
+                self.camera_session_active = False
+                self.voice.speak("Camera deactivated.")
+                self.status_var.set("Status: Ready")
+            else:
+                self.voice.speak("Camera is not active.")
+        else:
+            self.perform_capture(source=source)
+        return True
+
     def backend_loop(self):
         try:
             self.status_var.set("Status: Loading Models...")
@@ -371,13 +409,17 @@ class SirkitGUI:
             if not self.voice:
                 self.voice = VoiceEngine()
             if not self.llm:
-                self.llm = LLMClient()
+                self.llm = AsyncLLMClient()
                 # Initial sync
                 self.sync_files_to_ai()
+            if not self.compactor:
+                self.compactor = MemoryCompactor(self.llm.rag)
+                self.compactor.start()
             if not self.camera:
                 self.camera = CameraEngine()
+            timings = self.warm_up_models()
             
-            self.status_var.set(f"Status: Ready - Say '{config.WAKE_WORD}'")
+            self.status_var.set(f"Status: Ready - Say '{config.WAKE_WORD}' ({timings})")
             self.log("SYSTEM READY")
             self.voice.speak("System initialized. I am listening.")
 
@@ -390,7 +432,9 @@ class SirkitGUI:
                     session_active = True
                     while session_active and self.running:
                         self.status_var.set("Status: Listening...")
-                        user_text = self.voice.listen_and_transcribe()
+                        user_text = self.voice.listen_and_transcribe(
+                            on_partial=lambda text: self.status_var.set(f"Status: Hearing: {text[-60:]}")
+                        )
                         
                         if not user_text:
                             self.log("Session Timeout (Silence)")
@@ -400,48 +444,20 @@ class SirkitGUI:
 
                         self.log(f"YOU: {user_text}")
                         
-                        stop_phrases = ["stop", "exit", "goodbye", "thank you", "that's all"]
-                        if any(phrase in user_text.lower() for phrase in stop_phrases):
+                        intent = self.llm.router.route(user_text)
+                        if intent.name == "stop":
                             self.voice.speak("You're welcome. Standing by.")
                             self.log("SESSION ENDED")
                             session_active = False
                             continue
-                        
-                        # Command Parsing: Camera Mode
-                        user_text_lower = user_text.lower()
-                        
-                        if "capture" in user_text_lower and not "decapture" in user_text_lower:
-                            self.log("ACTION: Activating Camera Mode...")
-                            if not self.camera_session_active:
-                                if self.camera.start_session():
-                                    self.camera_session_active = True
-                                    self.voice.speak("Camera active. Say click to take photos.")
-                                else:
-                                    self.voice.speak("Failed to activate camera.")
-                            else:
-                                self.voice.speak("Camera is already active.")
-                            continue
-
-                        if "decapture" in user_text_lower:
-                            self.log("ACTION: Deactivating Camera Mode...")
-                            if self.camera_session_active:
-                                self.camera.stop_session()
-                                self.camera_session_active = False
-                                self.voice.speak("Camera deactivated.")
-                            else:
-                                self.voice.speak("Camera is not active.")
-                            continue
 
-                        if "click" in user_text_lower:
-                            self.perform_capture(source="Voice")
+                        if self.handle_command(intent, source="Voice"):
                             continue
 
                         self.status_var.set("Status: Thinking...")
-                        ai_response = self.llm.chat(user_text)
+                        ai_response = self.speak_reply(user_text, intent, source="Voice")
                         
                         self.log(f"JARVIS: {ai_response}")
-                        self.status_var.set("Status: Speaking...")
-                        self.voice.speak(ai_response)
                         self.status_var.set("Status: Active Session (Listening)")
                 
                 self.status_var.set("Status: Ready - Say 'Hey Jarvis'")
@@ -451,10 +467,59 @@ class SirkitGUI:
             self.running = False
             self.start_btn.config(state=tk.NORMAL)
 
+    def warm_up_models(self):
+        """
+        Pays every model's load cost during start-up instead of on the first
+        question. Logs the timings and returns a short summary for the status bar.
+        """
+        timings = []
+        self.status_var.set("Status: Loading Models... (LLM)")
+        llm_stats = self.llm.warm_up()
+        if "llm_load_s" in llm_stats:
+            timings.append(f"LLM load {llm_stats['llm_load_s']:.1f}s")
+        if "llm_ttft_s" in llm_stats:
+            timings.append(f"first token {llm_stats['llm_ttft_s']:.2f}s")
+
+        self.status_var.set("Status: Loading Models... (Whisper)")
+        whisper_s = self.voice.warm_up()
+        if whisper_s is not None:
+            timings.append(f"Whisper {whisper_s:.1f}s")
+
+        self.status_var.set("Status: Loading Models... (Embeddings)")
+        embed_s = self.llm.rag.warm_up()
+        if embed_s is not None:
+            timings.append(f"embeddings {embed_s:.1f}s")
+
+        summary = ", ".join(timings) if timings else "warm-up failed"
+        self.log(f"Warm-up: {summary}")
+        return summary
+
+    def speak_reply(self, user_text, intent, source="Voice"):
+        """Streams the LLM reply into TTS sentence by sentence; returns the full reply."""
+        cancel_event = self.reply_cancels[source] = threading.Event()
+        return self.voice.speak_stream(
+            iter_sentences(self.llm.chat_stream(user_text, intent, source=source)),
+            on_sentence=lambda _: self.status_var.set("Status: Speaking..."),
+            cancel_event=cancel_event
+        )
+
+    def cancel_reply(self, source=None):
+        """
+        Stops the reply in progress for one source (every source if None):
+        generation is cancelled, speech stops after the current sentence.
+        """
+        for name, cancel_event in list(self.reply_cancels.items()):
+            if source is None or name == source:
+                cancel_event.set()
+        if self.llm:
+            self.llm.cancel_all(source)
+
     def send_text(self):
         query = self.text_input.get().strip()
         if not query: return
         
+        # Barge-in: a new text request replaces the previous text reply; a voice reply keeps running
+        self.cancel_reply("Text")
         self.text_input.delete(0, tk.END)
         self.log(f"YOU (Text): {query}")
         threading.Thread(target=self.process_text_query, args=(query,), daemon=True).start()
@@ -463,48 +528,20 @@ class SirkitGUI:
         try:
             if not self.llm:
                 self.log("Initializing LLM...")
-                self.llm = LLMClient()
+                self.llm = AsyncLLMClient()
                 self.sync_files_to_ai()
             if not self.voice:
                 self.voice = VoiceEngine()
 
-            # Command Parsing: Camera Mode
-            query_lower = query.lower()
-            
-            if "capture" in query_lower and not "decapture" in query_lower:
-                self.log("ACTION: Activating Camera Mode...")
-                if not self.camera_session_active:
-                    if self.camera.start_session():
-                        self.camera_session_active = True
-                        self.voice.speak("Camera active.")
-                        self.status_var.set(f"Status: Camera Mode")
-                    else:
-                        self.voice.speak("Failed.")
-                else:
-                    self.voice.speak("Already active.")
-                return 
-
-            if "decapture" in query_lower:
-                self.log("ACTION: Deactivating Camera Mode...")
-                if self.camera_session_active:
-                    self.camera.stop_session()
-                    self.camera_session_active = False
-                    self.voice.speak("Camera deactivated.")
-                    self.status_var.set(f"Status: Ready")
-                else:
-                    self.voice.speak("Not active.")
-                return
-
-            if "click" in query_lower:
-                if self.perform_capture(source="Text"):
-                    return # Skip LLM chat
+            # Routed once: the same Intent decides command vs. chat and whether to retrieve
+            intent = self.llm.router.route(query)
+            if self.handle_command(intent, source="Text"):
+                return # Skip LLM chat
 
             self.status_var.set("Status: Thinking...")
-            ai_response = self.llm.chat(query)
+            ai_response = self.speak_reply(query, intent, source="Text")
             
             self.log(f"JARVIS: {ai_response}")
-            self.status_var.set("Status: Speaking...")
-            self.voice.speak(ai_response)
             self.status_var.set(f"Status: Ready - Say '{config.WAKE_WORD}'")
             self.status_var.set(f"Status: Ready - Say '{config.WAKE_WORD}'")
         except Exception as e:
@@ -513,16 +550,22 @@ class SirkitGUI:
 
     def exit_app(self):
         self.running = False
+        self.cancel_reply()
+        if self.llm:
+            self.llm.close()
+            # Persist any conversation turns still waiting in the write-behind buffer
+            self.llm.memory.close()
         if self.monitor:
             self.monitor.stop()
+        if self.compactor:
+            self.compactor.stop()
+        # Flush queued memories / file updates before the process exits
+        get_index_worker().stop()
         self.root.destroy()
 
     def start_monitor(self):
-        # We need a dummy RAG engine if LLM isn't loaded yet to avoid delay
-        # but better to just use the one llm_client will create.
-        # For now, let's wait until start_backend or initialize it here.
-        from rag_engine import RAGEngine
-        self.monitor_rag = RAGEngine()
+        # Same process-wide engine the LLMClient uses: one client, one embedding model
+        self.monitor_rag = get_rag_engine()
         self.monitor = FileMonitor(config.IMAGES_DIR, self.monitor_rag, self.on_fs_change)
         self.monitor.start()
 
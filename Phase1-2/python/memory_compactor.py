@@ -0,0 +1,116 @@
+"""
+SIGNIFICANCE:
+Keeps the 'Interaction:' memories in the knowledge base from growing without
+bound. A background job periodically drops near-duplicate memories (keeping
+the most recent of each cluster), expires memories older than a TTL and
+enforces a maximum memory count, then reports how much space it reclaimed.
+"""
+
+import datetime
+import threading
+import time
+import numpy as np
+import config
+
+def memory_timestamp(doc_id, metadata):
+    """Creation time of a memory: metadata first, else the doc_YYYYmmdd_HHMMSS_f id."""
+    if metadata and "timestamp" in metadata:
+        return float(metadata["timestamp"])
+    try:
+        stamp = datetime.datetime.strptime(doc_id[4:26], "%Y%m%d_%H%M%S_%f")
+        return stamp.timestamp()
+    except ValueError:
+        return 0.0
+
+class MemoryCompactor:
+    def __init__(self, rag_engine, interval=None):
+        self.rag = rag_engine
+        self.interval = interval or config.MEMORY_COMPACT_INTERVAL
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Memories at or before this time were already deduplicated
+        self.cursor = 0.0
+        self.last_report = {}
+        self.total_removed = 0
+        self.total_reclaimed_bytes = 0
+
+    def start(self):
+        if self.thread and self.thread.is_alive(): return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"(!) Memory compaction error: {e}")
+
+    def run_once(self):
+        """One incremental compaction pass. Returns a report dict."""
+        start = time.perf_counter()
+        started_at = time.time()
+        docs = self.rag.get_documents(where={"type": "memory"}, include=["documents", "metadatas", "embeddings"])
+        ids = docs['ids']
+        if not ids:
+            return {}
+
+        stamps = [memory_timestamp(i, m) for i, m in zip(ids, docs['metadatas'])]
+        order = sorted(range(len(ids)), key=lambda i: stamps[i], reverse=True)  # Newest first
+        new_count = sum(1 for i in order if stamps[i] > self.cursor)
+
+        drop = {}  # doc index -> reason
+        if new_count:
+            emb = np.asarray([docs['embeddings'][i] for i in order], dtype=np.float32)
+            emb /= np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12
+            # Only pairs involving a new memory need checking; old ones were compacted earlier
+            sims = emb @ emb[:new_count].T
+            kept_new = np.ones(new_count, dtype=bool)
+            for rank in range(1, len(order)):
+                newer = min(rank, new_count)
+                if np.any(kept_new[:newer] & (sims[rank, :newer] >= config.MEMORY_DUP_THRESHOLD)):
+                    drop[order[rank]] = "duplicate"
+                    if rank < new_count:
+                        kept_new[rank] = False
+
+        cutoff = time.time() - config.MEMORY_TTL_DAYS * 86400
+        survivors = 0
+        for i in order:
+            if i in drop:
+                continue
+            if stamps[i] < cutoff:
+                drop[i] = "expired"
+            elif survivors >= config.MEMORY_MAX_DOCS:
+                drop[i] = "over_budget"
+            else:
+                survivors += 1
+
+        if drop:
+            self.rag.delete_docs([ids[i] for i in drop])
+
+        dim = len(docs['embeddings'][0]) if len(docs['embeddings']) else 0
+        reclaimed = sum(len(docs['documents'][i].encode('utf-8')) + dim * 4 for i in drop)
+        reasons = list(drop.values())
+        # Leave a margin so memories still in the write-behind queue get checked next pass
+        self.cursor = min(max(stamps), started_at - 60)
+        self.total_removed += len(drop)
+        self.total_reclaimed_bytes += reclaimed
+        self.last_report = {
+            "scanned": len(ids),
+            "new": new_count,
+            "duplicates": reasons.count("duplicate"),
+            "expired": reasons.count("expired"),
+            "over_budget": reasons.count("over_budget"),
+            "remaining": len(ids) - len(drop),
+            "reclaimed_bytes": reclaimed,
+            "seconds": time.perf_counter() - start,
+        }
+        if drop:
+            r = self.last_report
+            print(f"[Compactor] Removed {len(drop)} memories ({r['duplicates']} duplicate, "
+                  f"{r['expired']} expired, {r['over_budget']} over budget), reclaimed ~{reclaimed / 1024:.1f} KB")
+        return self.last_report
@@ -1,43 +1,416 @@
 """
 SIGNIFICANCE:
 This module manages the Short-Term Memory (Session Persistence).
-It stores conversation history in a local JSON file, allowing SIRKIT 
-to maintain context between restarts and preventing repetitive dialogue. 
-It ensures the LLM has access to recent turn-by-turn interactions.
+It stores conversation history in an append-only JSON Lines file (one record
+per message), allowing SIRKIT to maintain context between restarts and
+preventing repetitive dialogue. Appends are written behind the conversation:
+messages arriving close together are coalesced into one fsync'd write on a
+background thread, and every rewrite goes through a temp file and an atomic
+rename, so a crash can cost at most the last unflushed batch. Only
+a bounded window of recent turns is held in RAM. Older turns are rotated into
+gzip-compressed archive segments, so start-up cost stays constant however
+long the history gets, while the archive remains readable for search and
+summarization. Every message is also added to a full-text index
+(history_search) for keyword recall with role and time filters.
 """
 
+import atexit
+import gzip
 import json
 import os
+import re
+import threading
+import time
+from collections import deque
+from itertools import islice
 import config
+from history_search import HistoryIndex
+
+SEGMENT_RE = re.compile(r"^history_(\d+)_(\d+)\.jsonl\.gz$")  # [start, end) message positions
 
 class MemoryManager:
-    def __init__(self, filename="conversation_history.json"):
+    def __init__(self, filename="conversation_history.jsonl", legacy_filename="conversation_history.json"):
         self.history_path = os.path.join(config.DATA_DIR, filename)
-        os.makedirs(config.DATA_DIR, exist_ok=True)
-        self.history = self._load_history()
+        self.legacy_path = os.path.join(config.DATA_DIR, legacy_filename)
+        self.archive_dir = os.path.join(config.DATA_DIR, "history_archive")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.lock = threading.RLock()            # In-memory state (window, count, pending writes)
+        self.io_lock = threading.Lock()          # The active file and archive on disk
+        self.cond = threading.Condition(self.lock)
+        self._migrate_legacy()
+        self._repair_tail()
+        self.segments = self._list_segments()
+        self.archived = self.segments[-1][1] if self.segments else 0  # Messages held in segments
+        self._drop_rotated_duplicates()
+        self.count = self.archived + self._count_records()
+        # Bounded window of the newest messages; older ones are read from disk on demand
+        self.history = deque(self._read_tail(config.MEMORY_TAIL_MESSAGES), maxlen=config.MEMORY_TAIL_MESSAGES)
+        self.clears = 0  # Bumped by clear_history so derived state (the summary) can reset
 
-    def _load_history(self):
-        if os.path.exists(self.history_path):
-            try:
-                with open(self.history_path, 'r') as f:
-                    return json.load(f)
-            except: pass
-        return []
+        # Write-behind state
+        self.pending = []              # Serialized records not yet on disk
+        self.writing = False
+        self.written = self.count      # Records durably on disk
+        self.closing = False
+        self.flush_event = threading.Event()
+        self.write_batches = 0
+        self.write_failures = 0
+        self.write_latencies = deque(maxlen=200)
+        self.search_index = HistoryIndex(os.path.join(config.DATA_DIR, "history_fts.sqlite3"))
+        self.writer = threading.Thread(target=self._run_writer, daemon=True)
+        self.writer.start()
+        self.closed = False
+        atexit.register(self.close)  # Scripts that never call close() still persist their last turns
 
-    def save_history(self):
+    def _migrate_legacy(self):
+        """One-time conversion of the old whole-file JSON history."""
+        if os.path.exists(self.history_path) or not os.path.exists(self.legacy_path):
+            return
         try:
-            with open(self.history_path, 'w') as f:
-                json.dump(self.history, f, indent=4)
-        except: pass
+            with open(self.legacy_path, 'r') as f:
+                messages = json.load(f)
+            ts = os.path.getmtime(self.legacy_path)  # Best available time for old messages
+            tmp_path = self.history_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for n, m in enumerate(messages):
+                    record = {"role": m["role"], "content": m["content"], "ts": m.get("ts", ts), "n": n}
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.history_path)
+            os.replace(self.legacy_path, self.legacy_path + ".migrated")
+            print(f"[Memory] Migrated {len(messages)} messages to {os.path.basename(self.history_path)}")
+        except Exception as e:
+            print(f"(!) History migration failed, keeping {os.path.basename(self.legacy_path)}: {e}")
+
+    def _repair_tail(self):
+        """Drops a half-written last record (crash mid-append) so appends stay line-aligned."""
+        if not os.path.exists(self.history_path):
+            return
+        with open(self.history_path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            keep = self._last_newline(f, size) + 1
+            f.truncate(keep)
+            print(f"(!) Dropped a partial history record ({size - keep} bytes)")
+
+    @staticmethod
+    def _last_newline(f, end, block_size=65536):
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block_size)
+            f.seek(start)
+            idx = f.read(pos - start).rfind(b"\n")
+            if idx >= 0:
+                return start + idx
+            pos = start
+        return -1
+
+    def _count_records(self, block_size=1 << 20):
+        if not os.path.exists(self.history_path):
+            return 0
+        count = 0
+        with open(self.history_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                count += block.count(b"\n")
+        return count
+
+    @staticmethod
+    def _parse(lines):
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print("(!) Skipping unreadable history record")
+        return records
+
+    def _read_tail(self, n, block_size=65536):
+        """Last n records, reading backwards from the end of the file."""
+        if n <= 0 or not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                start = max(0, pos - block_size)
+                f.seek(start)
+                data = f.read(pos - start) + data
+                pos = start
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        return self._parse(lines[-n:])
 
     def add_message(self, role, content):
-        self.history.append({"role": role, "content": content})
-        if len(self.history) > 100: pass
-        self.save_history()
+        """Records a message immediately in memory; it reaches disk with the next batch."""
+        with self.cond:
+            # 'n' is the message's absolute position; it lets start-up detect an interrupted rotation
+            record = {"role": role, "content": content, "ts": time.time(), "n": self.count}
+            self.pending.append(record)
+            self.count += 1
+            self.history.append(record)
+            self.cond.notify_all()
+
+    def _run_writer(self):
+        if self._needs_rotation():  # E.g. a freshly migrated legacy history
+            self._rotate()
+        try:
+            self._backfill_search_index()
+        except Exception as e:
+            print(f"(!) History search backfill failed: {e}")
+        while True:
+            with self.cond:
+                while not self.pending and not self.closing:
+                    self.cond.wait()
+                if not self.pending:
+                    return
+            # Let closely spaced messages (a user/assistant pair) join the same write
+            if not self.closing:
+                self.flush_event.wait(config.MEMORY_WRITE_WINDOW)
+            self.flush_event.clear()
+
+            with self.cond:
+                batch, self.pending = self.pending, []
+                self.writing = True
+            ok = self._write_batch(batch)
+            with self.cond:
+                if not ok:
+                    self.pending[:0] = batch  # Keep them for the next attempt
+                self.writing = False
+                self.cond.notify_all()
+            if not ok:
+                if self.closing:
+                    return
+                time.sleep(1.0)
+
+    def _write_batch(self, records):
+        """Appends a batch in one write and fsyncs it. Returns False on failure."""
+        start = time.perf_counter()
+        try:
+            with self.io_lock:
+                with open(self.history_path, 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(r) + "\n" for r in records))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.written += len(records)
+        except Exception as e:
+            self.write_failures += 1
+            print(f"(!) Error saving history ({len(records)} messages pending): {e}")
+            return False
+        self.write_latencies.append(time.perf_counter() - start)
+        self.write_batches += 1
+        try:
+            self.search_index.add((r["n"], r) for r in records)
+        except Exception as e:
+            print(f"(!) History search indexing failed: {e}")
+        if self._needs_rotation():
+            self._rotate()
+        return True
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything recorded so far is on disk. Returns False on timeout."""
+        with self.cond:
+            if not self.pending and not self.writing:
+                return True
+            self.flush_event.set()
+            return self.cond.wait_for(lambda: not self.pending and not self.writing, timeout)
+
+    def close(self, timeout=5.0):
+        """Flushes pending messages and stops the writer (call on shutdown). Safe to call more than once."""
+        if self.closed:
+            return True
+        self.closed = True
+        flushed = self.flush(timeout)
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        self.flush_event.set()
+        self.writer.join(timeout)
+        self.search_index.close()
+        if not flushed:
+            print(f"(!) History flush timed out; {len(self.pending)} messages not saved")
+        return flushed
+
+    def write_stats(self):
+        """Write-behind health: batches, failures, pending records and fsync'd write latency."""
+        latencies = sorted(self.write_latencies)
+        return {
+            "batches": self.write_batches,
+            "records_written": self.written,
+            "failures": self.write_failures,
+            "pending": len(self.pending),
+            "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+            "max_ms": latencies[-1] * 1000 if latencies else None,
+        }
 
     def get_recent_context(self, limit=10):
-        return self.history[-limit:]
+        with self.lock:
+            if limit <= len(self.history):
+                return list(islice(self.history, len(self.history) - limit, None))
+            return self.get_messages(max(0, self.count - limit))
+
+    def get_messages(self, start, end=None):
+        """Messages by absolute position in the history (slice semantics), archive included."""
+        with self.lock:
+            start, end, _ = slice(start, end).indices(self.count)
+            if start >= end:
+                return []
+            base = self.count - len(self.history)  # Position of the oldest cached message
+            if start >= base:
+                return list(islice(self.history, start - base, end - base))
+        return list(islice(self.iter_messages(start), end - start))
+
+    def iter_messages(self, start=0):
+        """
+        Streams every message from position `start` onwards: archive segments
+        first, then the active file. Nothing beyond one segment (or the
+        bounded active file) is held in memory.
+        """
+        self.flush()
+        return self._iter_persisted(start)
+
+    def _iter_persisted(self, start):
+        with self.io_lock:
+            segments, archived = list(self.segments), self.archived
+            active = []
+            if os.path.exists(self.history_path):
+                with open(self.history_path, 'r', encoding='utf-8', errors='replace') as f:
+                    active = self._parse(f)
+
+        for seg_start, seg_end, path in segments:
+            if seg_end <= start:
+                continue
+            position = seg_start
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as f:
+                    for record in self._parse(f):
+                        if position >= start:
+                            yield record
+                        position += 1
+            except Exception as e:
+                print(f"(!) Could not read history segment {os.path.basename(path)}: {e}")
+        yield from active[max(0, start - archived):]
+
+    def search_history(self, query, role=None, since=None, until=None, limit=5):
+        """Keyword search over all past messages (archive included); see HistoryIndex.search."""
+        return self.search_index.search(query, role=role, since=since, until=until, limit=limit)
+
+    def _backfill_search_index(self, batch_size=500):
+        """Indexes messages written before the search index existed or caught up (writer thread)."""
+        start = self.search_index.next_position()
+        if start > self.written:  # History was cleared or replaced
+            self.search_index.delete_from(self.written)
+            return
+        if start == self.written:
+            return
+        began = time.perf_counter()
+        batch = []
+        for n, record in enumerate(self._iter_persisted(start), start):
+            batch.append((n, record))
+            if len(batch) >= batch_size:
+                self.search_index.add(batch)
+                batch = []
+        self.search_index.add(batch)
+        print(f"[Memory] Indexed {self.written - start} past messages for search "
+              f"in {time.perf_counter() - began:.2f}s")
+
+    def archive_segments(self):
+        """Paths of the compressed archive segments, oldest first."""
+        return [path for _, _, path in self.segments]
+
+    def _list_segments(self):
+        segments = []
+        for name in os.listdir(self.archive_dir):
+            match = SEGMENT_RE.match(name)
+            if match:
+                segments.append((int(match.group(1)), int(match.group(2)), os.path.join(self.archive_dir, name)))
+        return sorted(segments)
+
+    def _needs_rotation(self):
+        return self.written - self.archived >= config.MEMORY_SEGMENT_MESSAGES + config.MEMORY_TAIL_MESSAGES
+
+    def _rotate(self):
+        """
+        Moves every full MEMORY_SEGMENT_MESSAGES block of the active file, except
+        the newest MEMORY_TAIL_MESSAGES, into gzip segments in one pass (writer
+        thread), so even a large migrated history is archived by a single rewrite.
+        """
+        start = time.perf_counter()
+        size = config.MEMORY_SEGMENT_MESSAGES
+        try:
+            with self.io_lock:
+                with open(self.history_path, 'r', encoding='utf-8') as f:
+                    lines = [line for line in f if line.strip()]
+                full = max(0, (len(lines) - config.MEMORY_TAIL_MESSAGES) // size)
+                if not full:
+                    return
+                # Segments first, then the trimmed active file; a crash in between leaves
+                # duplicates that start-up drops by their 'n' positions
+                for i in range(full):
+                    moved = lines[i * size:(i + 1) * size]
+                    seg_start, seg_end = self.archived, self.archived + len(moved)
+                    seg_path = os.path.join(self.archive_dir, f"history_{seg_start:09d}_{seg_end:09d}.jsonl.gz")
+                    with open(seg_path + ".tmp", 'wb') as raw:
+                        with gzip.open(raw, 'wt', encoding='utf-8') as f:
+                            f.writelines(moved)
+                        raw.flush()
+                        os.fsync(raw.fileno())
+                    os.replace(seg_path + ".tmp", seg_path)
+                    self.segments.append((seg_start, seg_end, seg_path))
+                    self.archived = seg_end
+                self._rewrite_active(lines[full * size:])
+            print(f"[Memory] Archived {full * size} messages into {full} segment(s) "
+                  f"in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"(!) History rotation failed: {e}")
+
+    def _rewrite_active(self, lines):
+        """Replaces the active file atomically (temp file + fsync + rename)."""
+        tmp_path = self.history_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.history_path)
+
+    def _drop_rotated_duplicates(self):
+        """Repairs a rotation interrupted after its segment was written."""
+        if not self.archived or not os.path.exists(self.history_path):
+            return
+        with open(self.history_path, 'r', encoding='utf-8', errors='replace') as f:
+            first = self._parse(islice(f, 1))
+        if not first or first[0].get("n", self.archived) >= self.archived:
+            return
+        kept = []
+        with open(self.history_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                records = self._parse([line])
+                if records and records[0].get("n", self.archived) >= self.archived:
+                    kept.append(line)
+        self._rewrite_active(kept)
+        print("(!) Finished an interrupted history rotation")
+
+    def message_count(self):
+        return self.count
 
     def clear_history(self):
-        self.history = []
-        self.save_history()
+        """Forgets the whole conversation: active file, archive segments and search index."""
+        self.flush()
+        with self.cond, self.io_lock:
+            self._rewrite_active([])
+            for _, _, path in self.segments:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"(!) Could not remove history segment {os.path.basename(path)}: {e}")
+            self.segments = []
+            self.pending = []
+            self.history.clear()
+            self.count = self.written = self.archived = 0
+            self.clears += 1
+        self.search_index.delete_from(0)
@@ -8,9 +8,143 @@ SIRKIT to answer questions based on its own knowledge base.
 
 import os
 import chromadb
-from chromadb.utils import embedding_functions
+import numpy as np
 import config
 import datetime
+import fnmatch
+import itertools
+import re
+import threading
+import time
+from index_manifest import IndexManifest, LISTING_PREFIX, hash_file, hash_text, listing_key
+from ttl_cache import TTLCache
+from embeddings import create_embedding_function
+from lexical_index import BM25Index, TOKEN_RE, is_identifier, reciprocal_rank_fusion
+
+# "(part N)" in chunk headers: every file has a part 1, 2, ... so the numbers are kept out of BM25
+CHUNK_PART_RE = re.compile(r" \(part \d+\)(?=:\n)")
+
+def lexical_text(doc):
+    return CHUNK_PART_RE.sub("", doc, count=1)
+
+def normalize_query(text):
+    """Cache key for a query: case, spacing and trailing punctuation are ignored."""
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+def _unit(vectors):
+    norm = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norm, 1e-12, None)
+
+def mmr_select(doc_vecs, relevance, k, lambda_mult):
+    """
+    Maximal marginal relevance: greedily picks up to k indices that balance
+    relevance against similarity to what was already picked.
+    """
+    picked = []
+    remaining = list(range(len(relevance)))
+    while remaining and len(picked) < k:
+        if picked:
+            redundancy = (doc_vecs[remaining] @ doc_vecs[picked].T).max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        picked.append(remaining.pop(int(np.argmax(scores))))
+    return picked
+
+def apply_char_budget(documents, budget=None):
+    """Keeps whole documents in order until the character budget is spent."""
+    budget = budget or config.RAG_CONTEXT_CHAR_BUDGET
+    kept, used = [], 0
+    for doc in documents:
+        if used + len(doc) > budget:
+            if not kept:
+                kept.append(doc[:budget])  # A single oversized chunk is clipped, not dropped
+            break
+        kept.append(doc)
+        used += len(doc)
+    return kept
+
+def relative_data_path(path):
+    """Path relative to DATA_DIR with forward slashes, used for document ids."""
+    return os.path.relpath(os.path.abspath(path), os.path.abspath(config.DATA_DIR)).replace(os.sep, "/")
+
+def chunk_doc_id(file_path, chunk_index):
+    """Stable document id for one chunk of a file, keyed on its DATA_DIR-relative path."""
+    return f"file_content_{relative_data_path(file_path)}#{chunk_index}"
+
+def is_ignored(name):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in config.RAG_IGNORE_PATTERNS)
+
+def _find_break(buffer, lower, upper):
+    """Prefers cutting a chunk at a paragraph, line or word boundary."""
+    for sep in ("\n\n", "\n", " "):
+        pos = buffer.rfind(sep, lower, upper)
+        if pos != -1:
+            return pos + len(sep)
+    return upper
+
+def iter_text_chunks(stream, chunk_size=None, overlap=None):
+    """
+    Streams overlapping text chunks out of a file-like object without
+    loading the whole file into memory.
+    """
+    size = chunk_size or config.RAG_CHUNK_SIZE
+    overlap = config.RAG_CHUNK_OVERLAP if overlap is None else overlap
+    overlap = max(0, min(overlap, size // 2))
+
+    buffer, carried, eof = "", 0, False
+    while True:
+        while not eof and len(buffer) < size:
+            block = stream.read(size)
+            if not block:
+                eof = True
+            else:
+                buffer += block
+
+        # Only the overlap from the previous chunk is left: nothing new to emit
+        if eof and len(buffer) <= carried:
+            return
+        if eof and len(buffer) <= size:
+            if buffer.strip():
+                yield buffer.strip()
+            return
+
+        cut = _find_break(buffer, max(overlap + 1, (size * 3) // 4), size)
+        chunk = buffer[:cut].strip()
+        if chunk:
+            yield chunk
+        start = max(cut - overlap, 0)
+        # Begin the overlap on a word boundary rather than mid-word
+        space = buffer.find(" ", start, cut)
+        if 0 < start and space != -1:
+            start = space + 1
+        carried = cut - start
+        buffer = buffer[start:]
+
+_registry_lock = threading.Lock()
+_engine_lock = threading.Lock()
+_shared_embedding_fn = None
+_shared_engine = None
+
+def get_embedding_function():
+    """Process-wide embedding model (backend from config.EMBEDDING_BACKEND), loaded once."""
+    global _shared_embedding_fn
+    with _registry_lock:
+        if _shared_embedding_fn is None:
+            _shared_embedding_fn = create_embedding_function()
+        return _shared_embedding_fn
+
+def get_rag_engine():
+    """
+    Process-wide RAGEngine. Every component (LLM client, file monitor,
+    scripts) should use this so there is a single PersistentClient on the
+    sqlite file and a single copy of the embedding model in memory.
+    """
+    global _shared_engine
+    with _engine_lock:
+        if _shared_engine is None:
+            _shared_engine = RAGEngine()
+        return _shared_engine
 
 class RAGEngine:
     def __init__(self):
@@ -18,62 +152,230 @@ class RAGEngine:
         os.makedirs(self.db_path, exist_ok=True)
         
         self.client = chromadb.PersistentClient(path=self.db_path)
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
+        self.embedding_fn = get_embedding_function()
+        # lock guards the collection + lexical index; sync_lock serialises
+        # manifest-driven indexing between the GUI and the file monitor
+        self.lock = threading.RLock()
+        self.sync_lock = threading.RLock()
         
         self.collection = self.client.get_or_create_collection(
             name="sirkit_knowledge",
             embedding_function=self.embedding_fn
         )
+        self._id_counter = itertools.count()
+        self.manifest = IndexManifest()
+        self._validate_manifest()
+        self._reconciled = False
+        self.embedding_cache = TTLCache(config.RAG_QUERY_CACHE_SIZE)
+        self.result_cache = TTLCache(config.RAG_QUERY_CACHE_SIZE, ttl=config.RAG_QUERY_CACHE_TTL)
+        self._index_generation = 0
+        self.last_ingest_stats = {}
+        self.lexical = BM25Index()
+        self._load_lexical_index()
 
     def add_text(self, text, metadata=None, doc_id=None):
-        if not doc_id:
-            doc_id = f"doc_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
-        
-        # Security: Enforce metadata source if not provided
-        final_metadata = metadata if metadata else {"source": "manual_entry"}
-        
-        # Security check: If metadata contains a path, ensure it's inside DATA_DIR
-        if "path" in final_metadata:
-            abs_path = os.path.abspath(final_metadata["path"])
-            if not abs_path.startswith(os.path.abspath(config.DATA_DIR)):
-                print(f"(!) Security Block: Attempted to index path outside data directory: {abs_path}")
-                return
-
-        self.collection.upsert(
-            documents=[text],
-            metadatas=[final_metadata],
-            ids=[doc_id]
-        )
+        self.add_texts([text], metadatas=[metadata], ids=[doc_id])
+
+    def add_texts(self, texts, metadatas=None, ids=None, batch_size=None):
+        """
+        Bulk ingestion: embeds documents in batches of `batch_size` and
+        upserts them together. Returns the number of documents indexed.
+        """
+        metadatas = metadatas or [None] * len(texts)
+        ids = ids or [None] * len(texts)
+        batch_size = batch_size or config.RAG_EMBED_BATCH_SIZE
+
+        # Later entries win if the same id is queued twice in one call
+        pending = {}
+        for text, metadata, doc_id in zip(texts, metadatas, ids):
+            if not doc_id:
+                doc_id = f"doc_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{next(self._id_counter)}"
+
+            # Security: Enforce metadata source if not provided
+            final_metadata = metadata if metadata else {"source": "manual_entry"}
+
+            # Security check: If metadata contains a path, ensure it's inside DATA_DIR
+            if "path" in final_metadata:
+                abs_path = os.path.abspath(final_metadata["path"])
+                if not abs_path.startswith(os.path.abspath(config.DATA_DIR)):
+                    print(f"(!) Security Block: Attempted to index path outside data directory: {abs_path}")
+                    continue
+
+            pending[doc_id] = (text, final_metadata)
+
+        if not pending:
+            return 0
+
+        doc_ids = list(pending)
+        documents = [pending[i][0] for i in doc_ids]
+        final_metadatas = [pending[i][1] for i in doc_ids]
+
+        start = time.perf_counter()
+        embeddings = []
+        for i in range(0, len(documents), batch_size):
+            embeddings.extend(self.embedding_fn(documents[i:i + batch_size]))
+
+        # One upsert per call, split only if Chroma's own batch limit would be exceeded
+        with self.lock:
+            for i in range(0, len(documents), config.RAG_UPSERT_MAX_BATCH):
+                end = i + config.RAG_UPSERT_MAX_BATCH
+                self.collection.upsert(
+                    ids=doc_ids[i:end],
+                    documents=documents[i:end],
+                    metadatas=final_metadatas[i:end],
+                    embeddings=embeddings[i:end]
+                )
+            for doc_id, doc in zip(doc_ids, documents):
+                self.lexical.add(doc_id, lexical_text(doc))
+            self._invalidate_query_cache()
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        self.last_ingest_stats = {
+            "docs": len(documents),
+            "seconds": elapsed,
+            "docs_per_sec": len(documents) / elapsed,
+        }
+        if len(documents) > 1:
+            print(f"[RAG] Indexed {len(documents)} docs in {elapsed:.2f}s ({len(documents) / elapsed:.1f} docs/sec)")
+        return len(documents)
 
     def delete_doc(self, doc_id):
         """Removes a specific document by ID."""
+        self.delete_docs([doc_id])
+
+    def delete_docs(self, doc_ids):
+        """Removes several documents by ID in one call."""
+        if not doc_ids:
+            return
+        with self.lock:
+            try:
+                self.collection.delete(ids=list(doc_ids))
+            except Exception as e:
+                print(f"Error deleting {len(doc_ids)} docs: {e}")
+            for doc_id in doc_ids:
+                self.lexical.remove(doc_id)
+            self._invalidate_query_cache()
+
+    def delete_file_content(self, file_path):
+        """Removes all RAG chunks associated with a specific file."""
+        file_path = os.path.abspath(file_path)
+        with self.sync_lock:
+            self._drop_file_chunks(file_path)
+            # A deleted folder takes everything indexed beneath it along, listings included
+            for path in self.manifest.paths_under(file_path) + self.manifest.listings_under(file_path):
+                self._drop_file_chunks(path)
+            self.manifest.save()
+
+    def _drop_file_chunks(self, file_path):
+        entry = self.manifest.remove(file_path)
+        if entry:
+            self.delete_docs(entry["chunk_ids"])
+            return
+        # Not in the manifest: may have been indexed before the manifest existed.
+        # Resolve ids first so the lexical index can drop them too.
+        doc_ids = []
         try:
-            self.collection.delete(ids=[doc_id])
+            with self.lock:
+                doc_ids = self.collection.get(where={"path": file_path}, include=[])['ids']
         except Exception as e:
-            print(f"Error deleting doc {doc_id}: {e}")
-
-    def delete_file_content(self, filename):
-        """Removes all RAG entries associated with a specific filename."""
-        doc_id = f"file_content_{filename}"
-        self.delete_doc(doc_id)
+            print(f"Error looking up chunks for {file_path}: {e}")
+        # Legacy single-document entry (pre-chunking index)
+        doc_ids.append(f"file_content_{os.path.basename(file_path)}")
+        self.delete_docs(doc_ids)
 
-    def rename_file_content(self, old_filename, new_filename, new_path):
+    def rename_file_content(self, old_path, new_path):
         """Updates file content mapping during a rename."""
-        self.delete_file_content(old_filename)
-        content = self._read_file_content(new_path)
-        if content:
-            self.add_text(
-                f"Content of file '{new_filename}':\n{content[:2000]}",
-                metadata={"type": "file_content", "filename": new_filename, "path": new_path},
-                doc_id=f"file_content_{new_filename}"
-            )
+        self.delete_file_content(old_path)
+        self.index_file(new_path)
 
-    def _read_file_content(self, file_path):
-        """Reads content from supported text files."""
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in ['.txt', '.md', '.json']:
+    def index_file(self, file_path, force=False):
+        """(Re)indexes a text file as overlapping chunks, replacing its previous chunks."""
+        return self.index_files([file_path], force=force)
+
+    def index_files(self, file_paths, force=False):
+        """(Re)indexes new or changed text files with one batched embed + upsert."""
+        with self.sync_lock:
+            texts, metadatas, ids = [], [], []
+            updates = self._collect_file_docs(file_paths, texts, metadatas, ids, force=force)
+            count = self.add_texts(texts, metadatas=metadatas, ids=ids)
+            self._commit_manifest(updates)
+            return count
+
+    def _collect_file_docs(self, file_paths, texts, metadatas, ids, force=False, stats=None):
+        """
+        Appends chunk documents for new or changed files and drops their stale
+        chunks. Files whose size/mtime or content hash match the manifest are
+        skipped. `stats` may carry stat results already gathered by a directory
+        walk. Returns the manifest updates to commit once the upsert is done.
+        """
+        stats = stats or {}
+        updates = []
+        for file_path in file_paths:
+            file_path = os.path.abspath(file_path)
+            if not self._is_text_file(file_path):
+                continue
+
+            entry = self.manifest.get(file_path)
+            try:
+                st = stats.get(file_path) or os.stat(file_path)
+                if not force and IndexManifest.stat_matches(entry, st.st_size, st.st_mtime):
+                    continue
+                content_hash = hash_file(file_path)
+            except OSError as e:
+                print(f"Error reading {file_path}: {e}")
+                continue
+
+            if not force and entry and entry.get("hash") == content_hash:
+                # Touched but not edited: remember the new stat, keep the chunks
+                self.manifest.touch(file_path, st.st_size, st.st_mtime)
+                continue
+
+            docs = self._file_chunk_docs(file_path)
+            if docs is None:
+                continue
+
+            new_ids = docs[2]
+            if entry:
+                keep = set(new_ids)
+                self.delete_docs([i for i in entry["chunk_ids"] if i not in keep])
+            else:
+                self._drop_file_chunks(file_path)
+            texts.extend(docs[0])
+            metadatas.extend(docs[1])
+            ids.extend(new_ids)
+            updates.append((file_path, st.st_size, st.st_mtime, content_hash, new_ids))
+        return updates
+
+    def _commit_manifest(self, updates):
+        for path, size, mtime, content_hash, chunk_ids in updates:
+            self.manifest.set(path, size, mtime, content_hash, chunk_ids)
+        self.manifest.save()
+
+    def _file_chunk_docs(self, file_path):
+        """Builds (texts, metadatas, ids) for every chunk of a text file."""
+        file_path = os.path.abspath(file_path)
+        stream = self._open_file(file_path)
+        if not stream:
+            return None
+
+        filename = os.path.basename(file_path)
+        texts, metadatas, ids = [], [], []
+        with stream:
+            for idx, chunk in enumerate(iter_text_chunks(stream)):
+                texts.append(f"Content of file '{filename}' (part {idx + 1}):\n{chunk}")
+                metadatas.append({
+                    "type": "file_content", "filename": filename, "path": file_path,
+                    "rel_path": relative_data_path(file_path), "chunk": idx
+                })
+                ids.append(chunk_doc_id(file_path, idx))
+        return texts, metadatas, ids
+
+    def _is_text_file(self, file_path):
+        return os.path.splitext(file_path)[1].lower() in ['.txt', '.md', '.json']
+
+    def _open_file(self, file_path):
+        """Opens supported text files for streaming reads."""
+        if not self._is_text_file(file_path):
             return None
         
         try:
@@ -83,14 +385,29 @@ class RAGEngine:
                 print(f"(!) Security Block: Attempted to read file outside data directory: {abs_file_path}")
                 return None
 
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
+            return open(file_path, 'r', encoding='utf-8', errors='ignore')
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+            return None
+
+    def _read_file_content(self, file_path):
+        """Reads content from supported text files."""
+        stream = self._open_file(file_path)
+        if not stream:
+            return None
+        try:
+            with stream:
+                return stream.read()
         except Exception as e:
             print(f"Error reading {file_path}: {e}")
             return None
 
     def sync_folder_contents(self, directory_path):
         """Indexes the list of files and their contents in a directory."""
+        with self.sync_lock:
+            return self._sync_folder_contents(directory_path)
+
+    def _sync_folder_contents(self, directory_path):
         if not os.path.exists(directory_path):
             return "Folder not found."
             
@@ -98,47 +415,275 @@ class RAGEngine:
         if not abs_dir.startswith(os.path.abspath(config.DATA_DIR)):
             return "(!) Security Block: Unauthorized folder access."
 
-        items = os.listdir(directory_path)
-        folder_name = os.path.basename(directory_path)
+        # 1. One os.scandir walk over the whole subtree
+        items, file_stats = self._scan_tree(abs_dir)
+        folder_name = os.path.basename(abs_dir)
+        texts, metadatas, ids, updates = [], [], [], []
         
-        # 1. Index the list of items
+        # 2. Index the list of items (only when the listing itself changed)
         file_list_text = f"The folder '{folder_name}' contains: " + ", ".join(items)
-        doc_id = f"folder_list_{folder_name}"
-        self.add_text(
-            file_list_text, 
-            metadata={"type": "folder_listing", "path": directory_path},
-            doc_id=doc_id
-        )
+        listing_hash = hash_text(file_list_text)
+        listing_entry = self.manifest.get(listing_key(abs_dir))
+        if not listing_entry or listing_entry.get("hash") != listing_hash:
+            doc_id = f"folder_list_{relative_data_path(abs_dir)}"
+            texts.append(file_list_text)
+            metadatas.append({"type": "folder_listing", "path": abs_dir})
+            ids.append(doc_id)
+            updates.append((listing_key(abs_dir), 0, 0, listing_hash, [doc_id]))
 
-        # 2. Index individual file contents for text files
-        for item in items:
-            item_path = os.path.join(directory_path, item)
-            if os.path.isfile(item_path):
-                content = self._read_file_content(item_path)
-                if content:
-                    # Limit content size to avoid overloading LLM/VectorDB
-                    content_to_index = content[:2000] # First 2k chars
-                    self.add_text(
-                        f"Content of file '{item}':\n{content_to_index}",
-                        metadata={"type": "file_content", "filename": item, "path": item_path},
-                        doc_id=f"file_content_{item}"
-                    )
-        
+        # 3. Collect chunks of new/changed text files, then embed them in one batched pass
+        changed = self._collect_file_docs(list(file_stats), texts, metadatas, ids, stats=file_stats)
+        updates.extend(changed)
+
+        # 4. Forget files and subfolder listings that disappeared anywhere below this folder
+        removed = [p for p in self.manifest.paths_under(abs_dir) if p not in file_stats]
+        for path in removed + self._vanished_listings(abs_dir):
+            self._drop_file_chunks(path)
+
+        self.add_texts(texts, metadatas=metadatas, ids=ids)
+        self._commit_manifest(updates)
+
+        # 5. Once per session, sweep ids that no manifest entry accounts for
+        if not self._reconciled:
+            self.reconcile()
+        if changed or removed:
+            print(f"[RAG] Synced '{folder_name}': {len(changed)} changed, {len(removed)} removed")
         return file_list_text
 
-    def query(self, query_text, n_results=3):
-        results = self.collection.query(
-            query_texts=[query_text],
-            n_results=n_results
-        )
-        
+    def _scan_tree(self, root):
+        """
+        Walks `root` recursively with os.scandir, skipping RAG_IGNORE_PATTERNS.
+        Returns (names directly inside root, {text file path: stat result}).
+        """
+        items, file_stats = [], {}
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if is_ignored(entry.name):
+                            continue
+                        if current == root:
+                            items.append(entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and self._is_text_file(entry.name):
+                            file_stats[entry.path] = entry.stat()
+            except OSError as e:
+                print(f"Error scanning {current}: {e}")
+        return items, file_stats
+
+    def _vanished_listings(self, directory):
+        """Listing keys at or below `directory` whose folder no longer exists."""
+        return [k for k in self.manifest.listings_under(directory) if not os.path.isdir(k[len(LISTING_PREFIX):])]
+
+    def reconcile(self):
+        """
+        Removes file/listing documents that no manifest entry owns: leftovers of
+        older id schemes (filename or absolute-path keyed) and of files deleted
+        while SIRKIT was not running. Returns the number of ids removed.
+        """
+        with self.sync_lock:
+            # Listings of folders deleted while SIRKIT was not running own nothing any more
+            vanished = self._vanished_listings(os.path.abspath(config.DATA_DIR))
+            for key in vanished:
+                self._drop_file_chunks(key)
+            if vanished:
+                self.manifest.save()
+            owned = set()
+            with self.manifest.lock:
+                for entry in self.manifest.entries.values():
+                    owned.update(entry.get("chunk_ids", []))
+            try:
+                indexed = self.get_documents(
+                    where={"type": {"$in": ["file_content", "folder_listing"]}}, include=[]
+                )['ids']
+            except Exception as e:
+                print(f"Error reconciling index: {e}")
+                return 0
+            orphans = [doc_id for doc_id in indexed if doc_id not in owned]
+            self.delete_docs(orphans)
+            self._reconciled = True
+            if orphans:
+                print(f"[RAG] Reconciled index: removed {len(orphans)} orphaned ids")
+            return len(orphans)
+
+    def _validate_manifest(self, page_size=1000):
+        """
+        Forgets manifest entries whose chunks are missing from the collection
+        (vector_db deleted or recreated), so those files are re-indexed on the
+        next sync instead of being skipped as unchanged.
+        """
+        recorded = self.manifest.chunk_ids()
+        if not recorded:
+            return
+        present = set()
+        if self.collection.count():
+            all_ids = [doc_id for ids in recorded.values() for doc_id in ids]
+            for i in range(0, len(all_ids), page_size):
+                present.update(self.collection.get(ids=all_ids[i:i + page_size], include=[])['ids'])
+        stale = [path for path, ids in recorded.items() if any(i not in present for i in ids)]
+        for path in stale:
+            self.manifest.remove(path)
+        self.manifest.save()
+        if stale:
+            print(f"[RAG] Index manifest: {len(stale)} entries had no chunks in the collection, will re-index")
+
+    def _invalidate_query_cache(self):
+        # Embeddings only depend on the query text, so they survive index writes
+        self._index_generation += 1
+        self.result_cache.clear()
+
+    def cache_stats(self):
+        """Hit/miss counters for the query embedding and result caches."""
+        return {
+            "embeddings": self.embedding_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+
+    def warm_up(self):
+        """Runs one embedding so the model's lazy init isn't paid by the first query. Returns seconds."""
+        start = time.perf_counter()
+        try:
+            self.embedding_fn(["warm up"])
+        except Exception as e:
+            print(f"(!) Embedding warm-up failed: {e}")
+            return None
+        return time.perf_counter() - start
+
+    def embed_query(self, query_text):
+        """Returns the (cached) embedding for a query string."""
+        key = normalize_query(query_text)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = list(self.embedding_fn([query_text])[0])
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    def query(self, query_text, n_results=3, mode=None):
+        """
+        Retrieves context for a query. `mode` is 'vector' (dense only),
+        'lexical' (BM25 only) or 'hybrid' (reciprocal rank fusion of both);
+        defaults to config.RAG_RETRIEVAL_MODE.
+        """
+        mode = mode or config.RAG_RETRIEVAL_MODE
+        cache_key = (normalize_query(query_text), n_results, mode)
+        context = self.result_cache.get(cache_key)
+        if context is not None:
+            return context
+
+        generation = self._index_generation
         context = ""
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                context += f"\n--- Context {i+1} ---\n{doc}\n"
-        return context.strip()
+        for i, doc in enumerate(self._retrieve(query_text, n_results, mode)):
+            context += f"\n--- Context {i+1} ---\n{doc}\n"
+        context = context.strip()
+        # Don't cache a result computed while a write invalidated the cache
+        if generation == self._index_generation:
+            self.result_cache.put(cache_key, context)
+        return context
+
+    def _retrieve(self, query_text, n_results, mode):
+        """
+        Candidate retrieval followed by a relevance cutoff (RAG_MAX_DISTANCE),
+        MMR diversification and the RAG_CONTEXT_CHAR_BUDGET. May return nothing.
+        """
+        candidates = max(n_results, config.RAG_HYBRID_CANDIDATES)
+        lexical_hits = []
+        if mode != "vector":
+            lexical_hits = self.lexical.search(query_text, k=candidates)
+        lexical_ids = [doc_id for doc_id, _ in lexical_hits]
+
+        identifiers = self._exact_identifiers(query_text) if mode != "vector" else []
+        if mode == "lexical" or (mode == "hybrid" and identifiers):
+            # Exact filename/id lookups: BM25 only, nothing is embedded. Relevance is
+            # gated lexically: chunks must contain one of the query's identifiers, or
+            # (plain lexical mode) score close enough to the best match.
+            if identifiers:
+                matching = self.lexical.docs_with_terms(identifiers)
+                top_ids = [doc_id for doc_id in lexical_ids if doc_id in matching]
+            else:
+                best = lexical_hits[0][1] if lexical_hits else 0.0
+                top_ids = [doc_id for doc_id, score in lexical_hits if score >= best * config.RAG_LEXICAL_MIN_RATIO]
+            top_ids = top_ids[:n_results]
+            documents, _ = self._fetch_documents(top_ids)
+            return apply_char_budget([documents[i] for i in top_ids if i in documents])
+
+        query_embedding = self.embed_query(query_text)
+        with self.lock:
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=candidates,
+                include=["documents", "embeddings"]
+            )
+        vector_ids = results['ids'][0] if results['ids'] else []
+        documents = dict(zip(vector_ids, results['documents'][0])) if vector_ids else {}
+        embeddings = dict(zip(vector_ids, results['embeddings'][0])) if vector_ids else {}
+
+        if mode == "vector":
+            ranked = [(doc_id, None) for doc_id in vector_ids]
+        else:
+            ranked = reciprocal_rank_fusion([vector_ids, lexical_ids], k=config.RAG_RRF_K)
+            missing_docs, missing_embs = self._fetch_documents(
+                [i for i, _ in ranked if i not in documents], with_embeddings=True
+            )
+            documents.update(missing_docs)
+            embeddings.update(missing_embs)
+        ranked = [(i, score) for i, score in ranked if i in documents and i in embeddings]
+        if not ranked:
+            return []
+
+        query_vec = _unit(np.asarray(query_embedding, dtype=np.float32))
+        doc_vecs = _unit(np.asarray([embeddings[i] for i, _ in ranked], dtype=np.float32))
+        similarity = doc_vecs @ query_vec
+
+        # Relevance cutoff: cosine distance from the query
+        keep = [k for k in range(len(ranked)) if 1.0 - similarity[k] <= config.RAG_MAX_DISTANCE]
+        if not keep:
+            return []
+        if mode == "vector":
+            relevance = similarity[keep]
+        else:
+            fused = np.asarray([ranked[k][1] for k in keep], dtype=np.float32)
+            relevance = fused / fused.max()
+
+        picked = mmr_select(doc_vecs[keep], relevance, n_results, config.RAG_MMR_LAMBDA)
+        return apply_char_budget([documents[ranked[keep[k]][0]] for k in picked])
+
+    def _exact_identifiers(self, query_text):
+        """Identifiers (filenames, ids, long numbers) named by the query that are present in the index."""
+        return [t for t in TOKEN_RE.findall(query_text.lower()) if is_identifier(t) and self.lexical.contains_term(t)]
+
+    def get_documents(self, where=None, include=None):
+        """Thread-safe passthrough to collection.get for maintenance jobs."""
+        with self.lock:
+            return self.collection.get(where=where, include=include or ["documents", "metadatas"])
+
+    def _fetch_documents(self, doc_ids, with_embeddings=False):
+        """Returns ({id: document}, {id: embedding}) for the given ids."""
+        if not doc_ids:
+            return {}, {}
+        include = ["documents", "embeddings"] if with_embeddings else ["documents"]
+        with self.lock:
+            results = self.collection.get(ids=list(doc_ids), include=include)
+        documents = dict(zip(results['ids'], results['documents']))
+        embeddings = dict(zip(results['ids'], results['embeddings'])) if with_embeddings else {}
+        return documents, embeddings
+
+    def _load_lexical_index(self, page_size=1000):
+        """Builds the BM25 index from the documents already in the collection."""
+        offset = 0
+        while True:
+            with self.lock:
+                page = self.collection.get(include=["documents"], limit=page_size, offset=offset)
+            for doc_id, doc in zip(page['ids'], page['documents']):
+                if doc:
+                    self.lexical.add(doc_id, lexical_text(doc))
+            if len(page['ids']) < page_size:
+                break
+            offset += page_size
 
 if __name__ == "__main__":
-    rag = RAGEngine()
+    rag = get_rag_engine()
     rag.add_text("Mathematics is the study of numbers and shapes.", doc_id="math_basics")
     print(rag.query("What is maths?"))
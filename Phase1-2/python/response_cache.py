@@ -0,0 +1,84 @@
+"""
+SIGNIFICANCE:
+Semantic response cache for the LLM client. Voice users repeat near-identical
+questions; if a new query embeds close enough to a cached one asked under the
+same context (file listing + retrieved knowledge), the cached answer is
+returned immediately instead of running a full generation. Follow-ups that
+lean on the previous turn ("why?", "tell me more about it") are never cached.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import config
+
+# Words that point back at the previous turn; a question using them has no stand-alone answer
+FOLLOW_UP_RE = re.compile(
+    r"\b(why|more|that|this|these|those|it|its|they|them|their|he|she|him|her|again|else|also|"
+    r"continue|go on|what about|and then|instead|previous|the last one)\b"
+)
+
+def is_follow_up(text):
+    """True for short or anaphoric turns whose answer depends on the conversation so far."""
+    words = text.lower().split()
+    return len(words) < 3 or FOLLOW_UP_RE.search(" ".join(words)) is not None
+
+class SemanticResponseCache:
+    def __init__(self, embed_fn, maxsize=None, ttl=None, threshold=None):
+        self.embed_fn = embed_fn  # text -> embedding (e.g. RAGEngine.embed_query)
+        self.maxsize = maxsize or config.RESPONSE_CACHE_SIZE
+        self.ttl = ttl or config.RESPONSE_CACHE_TTL
+        self.threshold = threshold or config.RESPONSE_CACHE_THRESHOLD
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # id -> (unit embedding, context hash, response, stored_at)
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _unit(self, text):
+        vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+    def lookup(self, query_text, context_hash):
+        """Returns the cached response for a similar query under the same context, or None."""
+        query_vec = self._unit(query_text)
+        now = time.monotonic()
+        with self.lock:
+            for key in [k for k, e in self.entries.items() if now - e[3] >= self.ttl]:
+                del self.entries[key]
+
+            candidates = [(k, e) for k, e in self.entries.items() if e[1] == context_hash]
+            if candidates:
+                sims = np.stack([e[0] for _, e in candidates]) @ query_vec
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+            self.misses += 1
+            return None
+
+    def store(self, query_text, context_hash, response):
+        query_vec = self._unit(query_text)
+        with self.lock:
+            self.entries[self.next_id] = (query_vec, context_hash, response, time.monotonic())
+            self.next_id += 1
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,151 @@
+"""
+SIGNIFICANCE:
+Incremental speech-to-text for the VoiceEngine. While the user is still
+speaking, a worker thread re-transcribes the growing audio window every
+fraction of a second and commits the words that two consecutive passes agree
+on (local agreement), so they are stable and never re-decoded. When the
+silence endpoint fires only the short uncommitted tail is left to transcribe,
+which makes the final transcript available almost immediately. Partial
+transcripts (committed + tentative words) are published as they change.
+"""
+
+import re
+import threading
+import time
+import numpy as np
+import config
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+class StreamingTranscriber:
+    def __init__(self, model, sample_rate=16000, on_partial=None, final_beam_size=5):
+        self.model = model  # faster_whisper.WhisperModel
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.final_beam_size = final_beam_size
+        self.lock = threading.Lock()
+        self.chunks = []                     # Audio fed by the recording callback, not yet buffered
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0.0              # Utterance time (s) of buffer[0]
+        self.committed = []                  # (start, end, word) agreed by two passes
+        self.hypothesis = []                 # Tentative words after the committed ones
+        self.partial = ""
+        self.passes = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def feed(self, audio):
+        """Called from the audio callback with mono float32 samples."""
+        with self.lock:
+            self.chunks.append(audio)
+
+    def _run(self):
+        step = int(config.STT_STREAM_INTERVAL * self.sample_rate)
+        while not self.stop_event.wait(0.05):
+            with self.lock:
+                pending = sum(len(c) for c in self.chunks)
+            if pending < step:  # Wait for enough new audio to be worth a pass
+                continue
+            try:
+                self._incremental_pass()
+            except Exception as e:
+                print(f"(!) Streaming STT pass failed: {e}")
+
+    def _drain(self):
+        with self.lock:
+            chunks, self.chunks = self.chunks, []
+        if chunks:
+            self.buffer = np.concatenate([self.buffer] + chunks)
+
+    def _committed_end(self):
+        return self.committed[-1][1] if self.committed else 0.0
+
+    def _uncommitted_audio(self):
+        cut = int((self._committed_end() - self.buffer_start) * self.sample_rate)
+        return self.buffer[max(0, cut):]
+
+    def _has_speech(self, audio, min_samples):
+        # Whisper invents words ("Thank you.") for silence, so silent audio is never transcribed
+        return len(audio) >= min_samples and np.max(np.abs(audio)) >= config.SILENCE_THRESHOLD
+
+    def _transcribe(self, beam_size):
+        """Words (start, end, text) in utterance time, for the audio after the committed prefix."""
+        prompt = "".join(w[2] for w in self.committed[-30:]).strip() or None
+        segments, _ = self.model.transcribe(
+            self.buffer, beam_size=beam_size, word_timestamps=True,
+            condition_on_previous_text=False, initial_prompt=prompt
+        )
+        committed_end = self._committed_end()
+        words = []
+        for segment in segments:
+            for w in segment.words or []:
+                start, end = w.start + self.buffer_start, w.end + self.buffer_start
+                if (start + end) / 2 > committed_end:  # Timestamps jitter between passes
+                    words.append((start, end, w.word))
+        self.passes += 1
+        return words
+
+    def _incremental_pass(self):
+        self._drain()
+        if len(self.buffer) < self.sample_rate // 2:
+            return
+        if not self._has_speech(self._uncommitted_audio(), 1):  # Nothing said since the last commit
+            return
+        words = self._transcribe(config.STT_STREAM_BEAM)
+
+        # Local agreement: the prefix two consecutive passes agree on is final
+        agreed = 0
+        while (agreed < min(len(words), len(self.hypothesis))
+               and _norm(words[agreed][2]) == _norm(self.hypothesis[agreed][2])):
+            agreed += 1
+        self.committed.extend(words[:agreed])
+        self.hypothesis = words[agreed:]
+
+        if len(self.buffer) / self.sample_rate > config.STT_STREAM_MAX_WINDOW:
+            self._trim_to_committed()
+        self._publish()
+
+    def _trim_to_committed(self):
+        """Drops audio already covered by committed words so passes stay short."""
+        cut = int((self._committed_end() - self.buffer_start) * self.sample_rate)
+        if cut > 0:
+            self.buffer = self.buffer[cut:]
+            self.buffer_start += cut / self.sample_rate
+
+    def _publish(self):
+        text = "".join(w[2] for w in self.committed + self.hypothesis).strip()
+        if text != self.partial:
+            self.partial = text
+            if self.on_partial:
+                try:
+                    self.on_partial(text)
+                except Exception as e:
+                    print(f"(!) Partial transcript callback failed: {e}")
+
+    def stop(self):
+        """Stops the worker thread without a final decode. Safe to call more than once."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def finish(self):
+        """Stops the worker and decodes only the uncommitted tail. Returns the final transcript."""
+        start = time.perf_counter()
+        self.stop()
+        self._drain()
+        self._trim_to_committed()
+        tail_s = len(self.buffer) / self.sample_rate
+        # Skip a tail that is only the trailing silence
+        if self._has_speech(self.buffer, self.sample_rate // 4):
+            self.committed.extend(self._transcribe(self.final_beam_size))
+        self.hypothesis = []
+        self._publish()
+        print(f"[STT] Final transcript in {time.perf_counter() - start:.2f}s "
+              f"({tail_s:.1f}s uncommitted tail, {self.passes} passes)")
+        return self.partial
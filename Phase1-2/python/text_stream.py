@@ -0,0 +1,36 @@
+"""
+SIGNIFICANCE:
+Turns a stream of LLM tokens into a stream of complete sentences so that
+Text-to-Speech can start on the first sentence while the model is still
+generating the rest of the reply.
+"""
+
+import re
+
+# Sentence end: terminal punctuation (optionally closed by a quote/bracket) followed by whitespace
+SENTENCE_END_RE = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "approx."}
+
+def _is_abbreviation(text):
+    words = text.split()
+    return bool(words) and words[-1].lower() in ABBREVIATIONS
+
+def iter_sentences(tokens, min_chars=12):
+    """
+    Yields sentences from an iterable of text pieces. Fragments shorter than
+    `min_chars` are merged into the next sentence so TTS isn't fed single words.
+    """
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        start = 0
+        for match in SENTENCE_END_RE.finditer(buffer):
+            candidate = buffer[start:match.end()].strip()
+            if len(candidate) < min_chars or _is_abbreviation(buffer[start:match.start() + 1]):
+                continue
+            yield candidate
+            start = match.end()
+        buffer = buffer[start:]
+
+    if buffer.strip():
+        yield buffer.strip()
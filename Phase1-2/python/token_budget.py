@@ -0,0 +1,154 @@
+"""
+SIGNIFICANCE:
+Keeps every chat prompt inside the model's context window. Each prompt
+section (history, folder listing, retrieved knowledge) gets a token budget;
+sections over budget are trimmed or condensed, and the final composition is
+logged per turn. Token counts come from a local tokenizer.json when one is
+configured, otherwise from a fast character/word heuristic.
+"""
+
+import os
+import re
+import config
+
+PIECE_RE = re.compile(r"\w+|[^\w\s]")
+CONTEXT_SPLIT_RE = re.compile(r"(?=--- Context \d+ ---)")
+TRUNCATION_SUFFIX = " ..."
+
+class TokenCounter:
+    def __init__(self, tokenizer_path=None):
+        self.tokenizer = None
+        path = tokenizer_path or config.LLM_TOKENIZER_PATH
+        if path and os.path.exists(path):
+            try:
+                from tokenizers import Tokenizer
+                self.tokenizer = Tokenizer.from_file(path)
+            except Exception as e:
+                print(f"(!) Tokenizer load failed, using estimates: {e}")
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.tokenizer:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        # Heuristic: one token per short word/symbol, long words split every ~4 chars
+        return sum(-(-len(piece) // 4) for piece in PIECE_RE.findall(text))
+
+    def truncate(self, text, max_tokens):
+        """Cuts text to roughly max_tokens, preferring a word boundary."""
+        if self.count(text) <= max_tokens:
+            return text
+        if max_tokens <= self.count(TRUNCATION_SUFFIX):
+            return ""
+        lo, hi = 0, len(text)
+        while lo < hi:  # Longest prefix that fits together with the suffix
+            mid = (lo + hi + 1) // 2
+            if self.count(text[:mid].rstrip() + TRUNCATION_SUFFIX) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = text.rfind(" ", 0, lo)
+        return text[:cut if cut > lo // 2 else lo].rstrip() + TRUNCATION_SUFFIX
+
+class PromptBudget:
+    def __init__(self, counter=None):
+        self.counter = counter or TokenCounter()
+        self.num_ctx = config.LLM_NUM_CTX
+        self.reserve = config.LLM_NUM_PREDICT  # Room left for the reply
+        self.budgets = {
+            "history": config.PROMPT_BUDGET_HISTORY,
+            "files": config.PROMPT_BUDGET_FILES,
+            "knowledge": config.PROMPT_BUDGET_KNOWLEDGE,
+            "summary": config.PROMPT_BUDGET_SUMMARY,
+        }
+        self.last_report = {}
+
+    def fit(self, persona, history, files_context, knowledge, user_text, summary=""):
+        """
+        Trims sections to their budgets (and the whole prompt to num_ctx).
+        Returns (history, files_context, knowledge, summary) ready to be assembled.
+        """
+        count = self.counter.count
+        summary = self.counter.truncate(summary, self.budgets["summary"])
+        fixed = count(persona) + count(user_text) + count(summary)
+        files_context = self._fit_listing(files_context, self.budgets["files"])
+        knowledge = self._fit_knowledge(knowledge, self.budgets["knowledge"])
+        history = self._fit_history(history, self.budgets["history"])
+
+        # Hard ceiling: shrink history, then knowledge, then the listing
+        limit = self.num_ctx - self.reserve
+        sizes = lambda: (self._history_tokens(history), count(knowledge), count(files_context))
+        overflow = fixed + sum(sizes()) - limit
+        if overflow > 0:
+            history = self._fit_history(history, max(0, sizes()[0] - overflow))
+            overflow = fixed + sum(sizes()) - limit
+        if overflow > 0:
+            knowledge = self._fit_knowledge(knowledge, max(0, sizes()[1] - overflow))
+            overflow = fixed + sum(sizes()) - limit
+        if overflow > 0:
+            files_context = self._fit_listing(files_context, max(0, sizes()[2] - overflow))
+
+        h, k, f = sizes()
+        self.last_report = {
+            "persona+user": fixed,
+            "summary": count(summary),
+            "history": h, "history_messages": len(history),
+            "files": f, "knowledge": k,
+            "total": fixed + h + k + f, "limit": limit,
+        }
+        r = self.last_report
+        print(f"[LLM] Prompt budget: persona+user+summary {fixed} | history {h}/{self.budgets['history']} ({len(history)} msgs)"
+              f" | files {f}/{self.budgets['files']} | knowledge {k}/{self.budgets['knowledge']}"
+              f" | total {r['total']}/{limit}")
+        return history, files_context, knowledge, summary
+
+    def _history_tokens(self, history):
+        # +4 per message for role/header tokens
+        return sum(self.counter.count(m['content']) + 4 for m in history)
+
+    def _fit_history(self, history, budget):
+        """Drops the oldest messages first; clips the newest one if it alone is too big."""
+        kept, used = [], 0
+        for message in reversed(history):
+            cost = self.counter.count(message['content']) + 4
+            if used + cost > budget:
+                if not kept and budget > 4:
+                    kept.append({**message, 'content': self.counter.truncate(message['content'], budget - 4)})
+                break
+            kept.append(message)
+            used += cost
+        return list(reversed(kept))
+
+    def _fit_knowledge(self, knowledge, budget):
+        """Keeps whole '--- Context n ---' blocks in rank order, clipping only the first."""
+        if self.counter.count(knowledge) <= budget:
+            return knowledge
+        kept, used = [], 0
+        for block in (b for b in CONTEXT_SPLIT_RE.split(knowledge) if b.strip()):
+            cost = self.counter.count(block)
+            if used + cost > budget:
+                if not kept:
+                    kept.append(self.counter.truncate(block, budget))
+                break
+            kept.append(block)
+            used += cost
+        return "".join(kept).strip()
+
+    def _fit_listing(self, listing, budget):
+        """Condenses a long 'folder contains: a, b, c' listing to 'a, b, ... and N more'."""
+        if self.counter.count(listing) <= budget:
+            return listing
+        head, sep, items_text = listing.partition(" contains: ")
+        if not sep:
+            return self.counter.truncate(listing, budget)
+        items = items_text.split(", ")
+        kept = []
+        for i, item in enumerate(items):
+            candidate = f"{head}{sep}{', '.join(kept + [item])} ... and {len(items) - i - 1} more"
+            if self.counter.count(candidate) > budget:
+                break
+            kept.append(item)
+        if not kept:
+            return self.counter.truncate(f"{head}{sep}{len(items)} items", budget)
+        more = len(items) - len(kept)
+        return f"{head}{sep}{', '.join(kept)}" + (f" ... and {more} more" if more else "")
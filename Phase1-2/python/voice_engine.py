@@ -8,6 +8,7 @@ and Text-to-Speech (pyttsx3) synthesis. It also implements Energy-based VAD
 
 import os
 import sys
+import queue
 import threading
 import numpy as np
 import sounddevice as sd
@@ -15,6 +16,7 @@ from openwakeword.model import Model
 from faster_whisper import WhisperModel
 import pyttsx3
 import config
+from streaming_stt import StreamingTranscriber
 import time
 
 class VoiceEngine:
@@ -31,6 +33,7 @@ class VoiceEngine:
 
         # STT Initialization (base model for balance)
         self.stt_model = WhisperModel("base", device="cpu", compute_type="int8")
+        self.partial_transcript = ""  # Live transcript of the utterance being recorded
 
         # TTS Initialization
         self.tts_engine = pyttsx3.init()
@@ -73,38 +76,103 @@ class VoiceEngine:
         if config.INPUT_DEVICE_ID is not None: return
         print("(!) Audio device ID resolution required if default fails.")
 
-    def listen_and_transcribe(self):
+    def listen_and_transcribe(self, on_partial=None):
+        """
+        Records until SILENCE_DURATION of silence and returns the transcript.
+        With config.STT_STREAMING, transcription runs while the user speaks and
+        `on_partial(text)` receives the transcript so far as it changes.
+        """
         fs, chunk_size = 16000, 1024
         max_silent_chunks = int(config.SILENCE_DURATION * fs / chunk_size)
         max_total_chunks = int(20 * fs / chunk_size)
         
         recording, silent_chunks, total_chunks = [], 0, 0
+        self.partial_transcript = ""
+        streamer = None
+        if config.STT_STREAMING:
+            def publish(text):
+                self.partial_transcript = text
+                if on_partial:
+                    on_partial(text)
+            streamer = StreamingTranscriber(self.stt_model, fs, on_partial=publish).start()
         
         def callback(indata, frames, time, status):
             nonlocal silent_chunks, total_chunks
             gained_indata = np.clip(indata * config.SENSITIVITY_GAIN, -1.0, 1.0)
             recording.append(gained_indata.copy())
+            if streamer:
+                streamer.feed(gained_indata[:, 0].astype(np.float32))
             if np.max(np.abs(gained_indata)) < config.SILENCE_THRESHOLD:
                 silent_chunks += 1
             else: silent_chunks = 0
             total_chunks += 1
 
-        with sd.InputStream(samplerate=fs, channels=1, device=config.INPUT_DEVICE_ID, 
-                            blocksize=chunk_size, callback=callback):
-            while silent_chunks < max_silent_chunks and total_chunks < max_total_chunks:
-                sd.sleep(100)
+        try:
+            with sd.InputStream(samplerate=fs, channels=1, device=config.INPUT_DEVICE_ID, 
+                                blocksize=chunk_size, callback=callback):
+                while silent_chunks < max_silent_chunks and total_chunks < max_total_chunks:
+                    sd.sleep(100)
+            if streamer:
+                return streamer.finish() if recording else ""
+        finally:
+            if streamer:
+                streamer.stop()  # Also when nothing was recorded or the stream failed
         
         if not recording: return ""
         audio_data = np.concatenate(recording).flatten()
         segments, _ = self.stt_model.transcribe(audio_data, beam_size=5)
         return "".join([s.text for s in segments]).strip()
 
+    def warm_up(self):
+        """Transcribes a second of silence so Whisper's first real call is fast. Returns seconds."""
+        start = time.perf_counter()
+        try:
+            segments, _ = self.stt_model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=5)
+            list(segments)  # Segments are generated lazily
+        except Exception as e:
+            print(f"(!) Whisper warm-up failed: {e}")
+            return None
+        return time.perf_counter() - start
+
     def speak(self, text):
         with self.tts_lock:
             print(f"SIRKIT: {text}")
             self.tts_engine.say(text)
             self.tts_engine.runAndWait()
 
+    def speak_stream(self, sentences, on_sentence=None, cancel_event=None):
+        """
+        Speaks sentences as they arrive. The (generator) source is consumed on a
+        separate thread so generation keeps running while TTS is talking.
+        Setting `cancel_event` stops speaking at the next sentence boundary.
+        Returns the full spoken text.
+        """
+        pending = queue.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for sentence in sentences:
+                    pending.put(sentence)
+            except Exception as e:
+                print(f"(!) Speech stream error: {e}")
+            finally:
+                pending.put(done)
+
+        threading.Thread(target=produce, daemon=True).start()
+        spoken = []
+        while True:
+            sentence = pending.get()
+            if sentence is done:
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            spoken.append(sentence)
+            if on_sentence:
+                on_sentence(sentence)
+            self.speak(sentence)
+        return " ".join(spoken)
+
 if __name__ == "__main__":
     v = VoiceEngine()
     v.speak("Voice engine test.")
@@ -0,0 +1,123 @@
+"""
+SIGNIFICANCE:
+Benchmarks the embedding backends available to the RAG engine on CPU:
+model load time, single-query latency (p50/p95), batch throughput,
+resident memory and how closely each backend agrees with the default
+Sentence-Transformers embeddings. Each backend runs in a fresh process
+so memory numbers are not polluted by the others.
+
+Usage: python bench_embeddings.py [--backends sentence_transformers onnx_int8] [--threads 4]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python"))
+
+import numpy as np
+
+SAMPLE_QUERIES = [
+    "what's in my folder",
+    "what did I say about the garden project",
+    "show me capture_20260203_170121.jpg",
+    "summarise my meeting notes from yesterday",
+    "who are you",
+]
+
+def _rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        import resource  # Unix fallback: peak RSS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+def _bench_backend(backend, threads, n_queries, n_docs, result_queue):
+    try:
+        result_queue.put(_measure(backend, threads, n_queries, n_docs))
+    except Exception as e:
+        # e.g. onnxruntime/tokenizers not installed or the model files missing
+        result_queue.put({"backend": backend, "error": f"{type(e).__name__}: {e}"})
+
+def _measure(backend, threads, n_queries, n_docs):
+    from embeddings import create_embedding_function
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    fn = create_embedding_function(backend, threads=threads)
+    fn(["warm up"])
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    for i in range(n_queries):
+        q = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        t = time.perf_counter()
+        fn([q])
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    docs = [f"Content of note {i}: " + " ".join(SAMPLE_QUERIES) for i in range(n_docs)]
+    t = time.perf_counter()
+    for i in range(0, n_docs, 32):
+        fn(docs[i:i + 32])
+    throughput = n_docs / (time.perf_counter() - t)
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "docs_per_sec": throughput,
+        "rss_mb": _rss_mb() - rss_before,
+        "vectors": np.asarray(fn(SAMPLE_QUERIES), dtype=np.float32),
+    }
+
+def _wait_for_result(proc, result_queue, backend):
+    """The child's result, or an error result if it died without reporting (e.g. a crash in native code)."""
+    while True:
+        try:
+            return result_queue.get(timeout=1.0)
+        except queue.Empty:
+            if not proc.is_alive():
+                return {"backend": backend, "error": f"process exited with code {proc.exitcode}"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG embedding backends on CPU.")
+    parser.add_argument("--backends", nargs="+", default=["sentence_transformers", "onnx_int8"])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--docs", type=int, default=512)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for backend in args.backends:
+        print(f"Benchmarking {backend}...")
+        result_queue = ctx.Queue()
+        proc = ctx.Process(target=_bench_backend, args=(backend, args.threads, args.queries, args.docs, result_queue))
+        proc.start()
+        result = _wait_for_result(proc, result_queue, backend)
+        proc.join()
+        if "error" in result:
+            print(f"(!) {backend} failed: {result['error']}")
+        else:
+            results.append(result)
+
+    if not results:
+        print("No backend could be benchmarked.")
+        return
+    reference = results[0]["vectors"]
+    print(f"\n{'backend':<22}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'docs/s':>9}{'RSS MB':>9}{'cos vs ' + results[0]['backend'][:6]:>14}")
+    for r in results:
+        a = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+        b = r["vectors"] / np.linalg.norm(r["vectors"], axis=1, keepdims=True)
+        agreement = float(np.mean(np.sum(a * b, axis=1)))
+        print(f"{r['backend']:<22}{r['load_s']:>8.2f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['docs_per_sec']:>9.1f}{r['rss_mb']:>9.1f}{agreement:>14.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+SIGNIFICANCE:
+End-to-end latency benchmark for the text pipeline (RAG retrieval + LLM
+chat) that runs without a microphone or a live Ollama. By default it starts
+the mock Ollama server in-process and works on a throwaway data directory
+seeded with synthetic notes, then drives RAGEngine.query and
+LLMClient.chat_stream with scripted queries and reports p50/p95/p99 latency,
+time to first token and throughput. Results can be saved as JSON and compared
+against a previous run to catch regressions.
+
+Usage: python bench_pipeline.py [--iterations 5] [--concurrency 1] [--host http://localhost:11434]
+       python bench_pipeline.py --json after.json --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), "python"))
+
+import numpy as np
+from mock_ollama_server import MockOllamaServer
+
+SCRIPTED_QUERIES = [
+    "who are you",
+    "what did I write about the garden project",
+    "summarise my meeting notes about the budget review",
+    "which photos did I take last week",
+    "remind me what the wifi password note says",
+    "what is in capture_20260203_170121.jpg",
+    "tell me about the trip to the mountains",
+    "what tasks are still open for the robot build",
+]
+
+TOPICS = ["garden project", "budget review", "robot build", "mountain trip", "wifi setup", "reading list"]
+
+def synthetic_notes(count):
+    notes = []
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        notes.append(
+            f"Note {i} about the {topic}. Discussed next steps for the {topic}, "
+            f"who owns which task and what is blocked. Follow-up item {i * 7 % 13} "
+            f"is due on day {i % 28 + 1}. Reference code NOTE-{i:04d}."
+        )
+    return notes
+
+def summarize(latencies_s, wall_s):
+    ms = np.asarray(latencies_s) * 1000
+    return {
+        "n": len(latencies_s),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "throughput_rps": len(latencies_s) / wall_s if wall_s else 0.0,
+    }
+
+def run_timed(fn, items, concurrency):
+    """Calls fn(item) for every item; returns (per-call results, wall-clock seconds)."""
+    start = time.perf_counter()
+    if concurrency <= 1:
+        results = [fn(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fn, items))
+    return results, time.perf_counter() - start
+
+def bench_rag(rag, queries, cached):
+    def one(query):
+        if not cached:
+            rag.result_cache.clear()
+            rag.embedding_cache.clear()
+        t = time.perf_counter()
+        rag.query(query)
+        return time.perf_counter() - t
+
+    rag.query(queries[0])  # Model warm-up is not part of the measurement
+    latencies, wall = run_timed(one, queries, 1)
+    return summarize(latencies, wall)
+
+def bench_llm(llm, queries, concurrency):
+    def one(query):
+        t = time.perf_counter()
+        ttft, chars = None, 0
+        for token in llm.chat_stream(query):
+            if ttft is None:
+                ttft = time.perf_counter() - t
+            chars += len(token)
+        return time.perf_counter() - t, ttft or 0.0, chars
+
+    results, wall = run_timed(one, queries, concurrency)
+    total = summarize([r[0] for r in results], wall)
+    ttft = summarize([r[1] for r in results], wall)
+    total["chars_per_sec"] = sum(r[2] for r in results) / wall if wall else 0.0
+    return total, ttft
+
+def print_report(results, baseline=None):
+    print(f"\n{'stage':<16}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'req/s':>9}"
+          + (f"{'p95 vs base':>13}" if baseline else ""))
+    for stage, r in results.items():
+        line = (f"{stage:<16}{r['n']:>5}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                f"{r['mean_ms']:>10.1f}{r['throughput_rps']:>9.2f}")
+        base = (baseline or {}).get(stage)
+        if base and base.get("p95_ms"):
+            line += f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:>+12.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SIRKIT's RAG + LLM pipeline offline.")
+    parser.add_argument("--host", help="real Ollama URL; omit to use the built-in mock server")
+    parser.add_argument("--data-dir", help="data directory to use (default: a fresh temp dir)")
+    parser.add_argument("--iterations", type=int, default=5, help="passes over the scripted queries")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel LLM turns")
+    parser.add_argument("--docs", type=int, default=200, help="synthetic notes to index")
+    parser.add_argument("--response-cache", action="store_true", help="leave the semantic response cache on")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="mock: tokens per second")
+    parser.add_argument("--first-token-latency", type=float, default=0.15, help="mock: seconds before first token")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier --json results to compare p95 against")
+    args = parser.parse_args()
+
+    server = None
+    if args.host:
+        os.environ["OLLAMA_HOST"] = args.host
+    else:
+        server = MockOllamaServer(token_rate=args.token_rate, first_token_latency=args.first_token_latency).start()
+        os.environ["OLLAMA_HOST"] = server.url
+    # Never benchmark against the real assistant's memory
+    os.environ["SIRKIT_DATA_DIR"] = args.data_dir or tempfile.mkdtemp(prefix="sirkit_bench_")
+
+    # config reads the environment at import time
+    import config
+    config.RESPONSE_CACHE_ENABLED = args.response_cache
+    config.SUMMARY_ENABLED = False  # Background summary folds would compete with the measured turns
+    from llm_client import LLMClient
+    from index_worker import get_index_worker
+
+    print(f"Ollama: {config.LLM_HOST}{' (mock)' if server else ''} | data: {config.DATA_DIR}")
+    llm = LLMClient()
+    notes = synthetic_notes(args.docs)
+    start = time.perf_counter()
+    llm.rag.add_texts(notes, [{"source": "bench"}] * len(notes))
+    print(f"Indexed {len(notes)} notes in {time.perf_counter() - start:.2f}s")
+
+    queries = SCRIPTED_QUERIES * args.iterations
+    results = {
+        "rag_uncached": bench_rag(llm.rag, queries, cached=False),
+        "rag_cached": bench_rag(llm.rag, queries, cached=True),
+    }
+    llm.warm_up()
+    results["llm_total"], results["llm_ttft"] = bench_llm(llm, queries, args.concurrency)
+
+    get_index_worker().stop()
+    llm.memory.close()
+    if server:
+        server.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print(f"\nLLM output rate: {results['llm_total']['chars_per_sec']:.0f} chars/s"
+          f" | KV-cache reuse: {llm.prompt_cache_stats()['hit_rate']:.0%}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+SIGNIFICANCE:
+Stand-in for a local Ollama server so the chat pipeline can be exercised and
+benchmarked without a GPU, a model download or a running Ollama. Implements
+the endpoints SIRKIT uses (/api/chat, /api/generate, /api/tags, /api/version)
+with NDJSON streaming, and simulates model load time, prompt evaluation with
+a prefix (KV) cache, time to first token and a fixed generation rate.
+
+Usage: python mock_ollama_server.py [--port 11435] [--token-rate 40] [--first-token-latency 0.15]
+Then point SIRKIT at it with OLLAMA_HOST=http://127.0.0.1:11435
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Sure. Here is a short answer from the mock model. "
+    "It streams at a fixed rate so latency numbers are repeatable. "
+    "Nothing here comes from a real language model."
+)
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4) if text else 0
+
+class MockOllamaServer:
+    def __init__(self, host="127.0.0.1", port=0, token_rate=40.0, first_token_latency=0.15,
+                 load_latency=1.0, prompt_rate=2000.0, reply=DEFAULT_REPLY):
+        self.token_rate = token_rate                    # Generated tokens per second
+        self.first_token_latency = first_token_latency  # Fixed overhead before the first token
+        self.load_latency = load_latency                # Paid once per model until unloaded
+        self.prompt_rate = prompt_rate                  # Prompt tokens evaluated per second
+        self.reply_tokens = reply.split(" ")
+        self.loaded = set()
+        self.last_prompt = ""                           # Simulated KV cache (one slot, like Ollama)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def load_model(self, model, keep_alive):
+        """Returns the simulated load time in seconds (0 if already resident)."""
+        with self.lock:
+            self.requests += 1
+            cold = model not in self.loaded
+            if keep_alive in (0, "0", "0s"):
+                self.loaded.discard(model)
+            else:
+                self.loaded.add(model)
+        if cold:
+            time.sleep(self.load_latency)
+            return self.load_latency
+        return 0.0
+
+    def evaluate_prompt(self, prompt):
+        """Only the part after the longest shared prefix with the previous prompt is evaluated."""
+        with self.lock:
+            shared = 0
+            for a, b in zip(prompt, self.last_prompt):
+                if a != b:
+                    break
+                shared += 1
+            self.last_prompt = prompt
+        evaluated = _estimate_tokens(prompt[shared:])
+        seconds = evaluated / self.prompt_rate if self.prompt_rate else 0.0
+        time.sleep(seconds)
+        return evaluated, seconds
+
+    def reply_pieces(self, num_predict):
+        limit = num_predict if num_predict and num_predict > 0 else len(self.reply_tokens)
+        tokens = self.reply_tokens[:limit]
+        return [t + (" " if i < len(tokens) - 1 else "") for i, t in enumerate(tokens)]
+
+class _Handler(BaseHTTPRequestHandler):
+    mock = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": m, "model": m} for m in sorted(self.mock.loaded)]
+            self._send_json({"models": models})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-mock"})
+        elif self.path == "/":
+            self._send_text("Ollama is running")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        if self.path == "/api/chat":
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            self._generate(body, prompt, chat=True)
+        elif self.path == "/api/generate":
+            self._generate(body, body.get("prompt", ""), chat=False)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, body, prompt, chat):
+        model = body.get("model", "mock")
+        start = time.perf_counter()
+        load_s = self.mock.load_model(model, body.get("keep_alive"))
+
+        # An empty generate prompt just loads the model (used for warm-up)
+        if not chat and not prompt:
+            self._send_json({"model": model, "created_at": _now(), "response": "", "done": True,
+                             "done_reason": "load", "load_duration": int(load_s * 1e9)})
+            return
+
+        prompt_tokens, prompt_s = self.mock.evaluate_prompt(prompt)
+        time.sleep(self.mock.first_token_latency)
+        pieces = self.mock.reply_pieces((body.get("options") or {}).get("num_predict"))
+
+        def chunk(text, done):
+            data = {"model": model, "created_at": _now(), "done": done}
+            if chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            return data
+
+        def final():
+            data = chunk("", True)
+            data.update({
+                "done_reason": "stop",
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": int(load_s * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_s * 1e9),
+                "eval_count": len(pieces),
+                "eval_duration": int(len(pieces) / self.mock.token_rate * 1e9) if self.mock.token_rate else 0,
+            })
+            return data
+
+        delay = 1.0 / self.mock.token_rate if self.mock.token_rate else 0.0
+        if body.get("stream", True) is False:
+            time.sleep(delay * len(pieces))
+            data = final()
+            if chat:
+                data["message"]["content"] = "".join(pieces)
+            else:
+                data["response"] = "".join(pieces)
+            self._send_json(data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(delay)
+                self._write_chunk(chunk(piece, False))
+            self._write_chunk(final())
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled the generation
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, data, status=200):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_text(self, text):
+        payload = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for offline testing and benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-rate", type=float, default=40.0, help="generated tokens per second")
+    parser.add_argument("--first-token-latency", type=float, default=0.15, help="seconds before the first token")
+    parser.add_argument("--load-latency", type=float, default=1.0, help="seconds to 'load' a cold model")
+    parser.add_argument("--prompt-rate", type=float, default=2000.0, help="prompt tokens evaluated per second")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, args.token_rate, args.first_token_latency,
+                              args.load_latency, args.prompt_rate)
+    print(f"Mock Ollama listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
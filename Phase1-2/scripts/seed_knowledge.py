@@ -5,26 +5,34 @@ It seeds the vector database with information about the SIRKIT project and
 general concepts to ensure the assistant has a useful starting context.
 """
 
-from rag_engine import RAGEngine
+from rag_engine import get_rag_engine
 
 def initialize_knowledge():
-    rag = RAGEngine()
+    rag = get_rag_engine()
     
     # Clean up old sensitive data if it exists
     try:
         # Delete old project_phases if it exists
-        rag.collection.delete(ids=["project_phases"])
+        rag.delete_docs(["project_phases"])
         print("Cleared legacy project context.")
     except:
         pass
 
-    # Core Identity - Generic and Safe
-    rag.add_text(
-        "I am SIRKIT, a local voice assistant designed for privacy and speed. "
-        "I can help you manage your local files, answer questions using RAG, "
-        "and assist with various tasks entirely offline.",
-        doc_id="about_sirkit"
+    # Core Identity - Generic and Safe (batched through the bulk ingestion path)
+    seed_docs = {
+        "about_sirkit": (
+            "I am SIRKIT, a local voice assistant designed for privacy and speed. "
+            "I can help you manage your local files, answer questions using RAG, "
+            "and assist with various tasks entirely offline."
+        ),
+    }
+    rag.add_texts(
+        list(seed_docs.values()),
+        metadatas=[{"source": "seed"} for _ in seed_docs],
+        ids=list(seed_docs)
     )
+    stats = rag.last_ingest_stats
+    print(f"Seeded {stats.get('docs', 0)} docs ({stats.get('docs_per_sec', 0):.1f} docs/sec).")
     
     print("Success: RAG Reset and Seeded.")
 